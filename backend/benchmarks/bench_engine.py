@@ -0,0 +1,91 @@
+"""Per-call latency: fresh in-memory connection vs the shared DuckDB engine.
+
+The legacy path opens ``duckdb.connect(":memory:")`` and registers every
+DataFrame on each ``query_data`` call; the engine path reuses one database
+with native tables and only opens a cursor.
+
+Run from ``backend/``:
+
+    PYTHONPATH=src python benchmarks/bench_engine.py [--iterations 200]
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+
+import duckdb
+import pandas as pd
+
+from data.engine import DuckDBEngine
+from data.loader import get_datasets
+
+QUERIES = {
+    "telco_churn_by_contract": (
+        "SELECT Contract, Churn, COUNT(*) AS n, AVG(MonthlyCharges) AS avg_charges "
+        "FROM telcoclient GROUP BY Contract, Churn ORDER BY Contract, Churn"
+    ),
+    "telco_point_lookup": "SELECT * FROM telcoclient WHERE customerID = '7590-VHVEG'",
+    "cc_balance_quantiles": (
+        "SELECT TENURE, quantile_cont(BALANCE, [0.25, 0.5, 0.75]) AS q, MAX(CREDIT_LIMIT) AS max_limit "
+        "FROM ccgeneral GROUP BY TENURE ORDER BY TENURE"
+    ),
+    "cc_top_purchasers": "SELECT CUST_ID, PURCHASES FROM ccgeneral ORDER BY PURCHASES DESC LIMIT 10",
+}
+
+
+def per_call_connection(datasets: dict[str, pd.DataFrame]) -> Callable[[str], None]:
+    """The original ``query_data`` path."""
+    def run(sql: str) -> None:
+        with duckdb.connect(database=":memory:") as conn:
+            for name, df in datasets.items():
+                conn.register(name, df)
+            conn.execute(sql).fetchdf()
+    return run
+
+
+def shared_engine(engine: DuckDBEngine) -> Callable[[str], None]:
+    def run(sql: str) -> None:
+        with engine.cursor() as cur:
+            cur.execute(sql).fetchdf()
+    return run
+
+
+def measure(fn: Callable[[str], None], sql: str, iterations: int) -> list[float]:
+    fn(sql)  # warm-up
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(sql)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings: list[float]) -> str:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    return f"mean {statistics.mean(timings):7.2f} ms | p50 {statistics.median(timings):7.2f} ms | p95 {p95:7.2f} ms"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    datasets = dict(get_datasets())  # The loader doesn't keep the frames: read them once
+    start = time.perf_counter()
+    engine = DuckDBEngine(datasets)
+    print(f"Engine build (one-off): {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    for label, sql in QUERIES.items():
+        legacy = measure(per_call_connection(datasets), sql, args.iterations)
+        shared = measure(shared_engine(engine), sql, args.iterations)
+        speedup = statistics.mean(legacy) / statistics.mean(shared)
+        print(label)
+        print(f"  per-call connection  {summarize(legacy)}")
+        print(f"  shared engine        {summarize(shared)}")
+        print(f"  speedup              x{speedup:.1f}\n")
+
+
+if __name__ == "__main__":
+    main()
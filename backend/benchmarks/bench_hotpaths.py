@@ -0,0 +1,107 @@
+"""Micro-benchmarks for the per-token and per-tool hot paths of a chat stream.
+
+- ``ThinkingTagParser.feed`` over a token stream with thinking blocks
+- ``sse`` / ``sse_text`` frame formatting
+- ``query_data`` (uncached, and served from the result cache)
+- ``visualize`` (inline render: exec + Plotly JSON + compression)
+
+Run from ``backend/``:
+
+    PYTHONPATH=src python benchmarks/bench_hotpaths.py [--iterations 200] [--tokens 10000]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import types
+from collections.abc import Callable
+
+from mock_llm import QUERY_SQL, VISUALIZE_CODE, tokens
+
+from agent.context import AgentContext
+from agent.tools.query_data import query_data
+from agent.tools.render import render
+from api.models.streaming import sse, sse_text
+from data.engine import get_engine
+from data.query_cache import QueryCache
+from services.streaming import ThinkingTagParser
+
+
+def measure(fn: Callable[[], object], iterations: int) -> list[float]:
+    fn()  # warm-up
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings: list[float]) -> str:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    return f"mean {statistics.mean(timings):8.3f} ms | p50 {statistics.median(timings):8.3f} ms | p95 {p95:8.3f} ms"
+
+
+def token_stream(count: int) -> list[str]:
+    """*count* tokens with a thinking block every 100 tokens, tags split across tokens."""
+    stream = []
+    for i, token in enumerate(tokens(count, seed=0)):
+        if i % 100 == 0:
+            stream += ["<thin", "king>"]
+        stream.append(token)
+        if i % 100 == 50:
+            stream += ["</", "thinking>"]
+    return stream
+
+
+def parse(stream: list[str]) -> None:
+    parser = ThinkingTagParser()
+    for chunk in stream:
+        parser.feed(chunk)
+    parser.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=10_000, help="Stream length for the parser/SSE benchmarks")
+    args = parser.parse_args()
+
+    stream = token_stream(args.tokens)
+    payload = {"tool_name": "query_data", "args": {"sql": QUERY_SQL}, "tool_call_id": "call_query"}
+
+    per_stream = {
+        f"ThinkingTagParser ({len(stream)} chunks)": lambda: parse(stream),
+        f"sse_text ({len(stream)} frames)": lambda: [sse_text("content", t) for t in stream],
+        f"sse tool_call ({len(stream)} frames)": lambda: [sse("tool_call", payload) for _ in stream],
+    }
+    for label, fn in per_stream.items():
+        timings = measure(fn, max(args.iterations // 10, 5))
+        per_token_us = statistics.mean(timings) * 1000 / len(stream)
+        print(f"{label:40s} {summarize(timings)} | {per_token_us:.2f} us/chunk")
+
+    engine = get_engine()
+    uncached = types.SimpleNamespace(deps=AgentContext(engine=engine))
+    cached = types.SimpleNamespace(deps=AgentContext(engine=engine, query_cache=QueryCache(64 * 1024 * 1024)))
+    loop = asyncio.new_event_loop()
+
+    def run_query(ctx) -> None:
+        loop.run_until_complete(query_data(ctx, QUERY_SQL, "benchmark"))
+        ctx.deps.current_result.discard()
+
+    loop.run_until_complete(query_data(uncached, QUERY_SQL, "benchmark"))
+    df = uncached.deps.current_result.to_pandas()
+    tools = {
+        "query_data (uncached)": lambda: run_query(uncached),
+        "query_data (cache hit)": lambda: run_query(cached),
+        "visualize render (inline)": lambda: render(df, VISUALIZE_CODE, "Churn by contract", "figure"),
+    }
+    for label, fn in tools.items():
+        print(f"{label:40s} {summarize(measure(fn, args.iterations))}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
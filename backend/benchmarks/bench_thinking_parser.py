@@ -0,0 +1,117 @@
+"""Throughput of ThinkingTagParser vs the original re-slicing implementation.
+
+Three stream shapes, at growing lengths (up to 100k tokens):
+
+- ``token``: one chunk per token, as streamed by most providers
+- ``burst``: 1000 tokens per chunk with a tag pair every 20 tokens
+- ``whole``: the entire response in one chunk (non-streaming fallback),
+  where the original parser re-sliced its buffer after every tag
+
+A linear parser keeps a constant cost per token as the stream grows.
+
+Run from ``backend/``:
+
+    PYTHONPATH=src python benchmarks/bench_thinking_parser.py [--sizes 10000 50000 100000]
+"""
+
+import argparse
+import time
+
+from mock_llm import tokens
+
+from services.streaming import ThinkingTagParser
+
+
+class LegacyThinkingTagParser:
+    """The original parser: ``buf += chunk``, re-slice after each tag, ``rfind("<")`` per chunk."""
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._inside = False
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        self._buf += chunk
+        results = []
+        event = "thinking" if self._inside else "content"
+        next_tag = "</thinking>" if self._inside else "<thinking>"
+        while (idx := self._buf.find(next_tag)) != -1:
+            if idx:
+                results.append((event, self._buf[:idx]))
+            self._buf = self._buf[idx + len(next_tag):]
+            self._inside = not self._inside
+            event = "thinking" if self._inside else "content"
+            next_tag = "</thinking>" if self._inside else "<thinking>"
+        if self._buf:
+            last_lt = self._buf.rfind("<")
+            if last_lt != -1 and next_tag.startswith(self._buf[last_lt:]):
+                if last_lt:
+                    results.append((event, self._buf[:last_lt]))
+                self._buf = self._buf[last_lt:]
+            else:
+                results.append((event, self._buf))
+                self._buf = ""
+        return results
+
+    def flush(self) -> list[tuple[str, str]]:
+        leftover = [("thinking" if self._inside else "content", self._buf)] if self._buf else []
+        self._buf = ""
+        return leftover
+
+
+def token_chunks(count: int) -> list[str]:
+    """One chunk per token, with a thinking block (tags split in two) every 100 tokens."""
+    chunks = []
+    for i, token in enumerate(tokens(count, seed=0)):
+        if i % 100 == 0:
+            chunks += ["<thin", "king>"]
+        chunks.append(token)
+        if i % 100 == 50:
+            chunks += ["</thin", "king>"]
+    return chunks
+
+
+def burst_chunks(count: int, per_chunk: int = 1000) -> list[str]:
+    """Chunks of *per_chunk* tokens, alternating thinking/content every 20 tokens."""
+    words = tokens(count, seed=0)
+    pieces = []
+    for i in range(0, count, 20):
+        tag = "<thinking>" if (i // 20) % 2 == 0 else "</thinking>"
+        pieces.append(tag + "".join(words[i:i + 20]))
+    step = per_chunk // 20
+    return ["".join(pieces[i:i + step]) for i in range(0, len(pieces), step)]
+
+
+def whole_chunk(count: int) -> list[str]:
+    return ["".join(burst_chunks(count))]
+
+
+def run(parser_cls, chunks: list[str]) -> float:
+    parser = parser_cls()
+    start = time.perf_counter()
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.flush()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N runs")
+    args = parser.parse_args()
+
+    for shape, build in (("token", token_chunks), ("burst", burst_chunks), ("whole", whole_chunk)):
+        print(f"{shape} stream")
+        for size in args.sizes:
+            chunks = build(size)
+            legacy = min(run(LegacyThinkingTagParser, chunks) for _ in range(args.repeat))
+            current = min(run(ThinkingTagParser, chunks) for _ in range(args.repeat))
+            print(
+                f"  {size:>7} tokens  legacy {legacy * 1000:8.2f} ms ({legacy / size * 1e9:6.0f} ns/token)"
+                f" | current {current * 1000:8.2f} ms ({current / size * 1e9:6.0f} ns/token)"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""Concurrent ``/api/v1/llm/chat`` SSE clients against the app with a mock LLM.
+
+Starts the real app (uvicorn, lifespan included) in a background thread
+with the agent's model replaced by `mock_llm.mock_model`, then drives
+``--clients`` concurrent streaming clients, each sending ``--requests``
+chats back to back under its own client ID. The global admission limit
+is lifted (``--max-active``), so runs are not queued behind it. Reports
+TTFT (first ``content``/``thinking`` frame) percentiles, stream
+durations, events per second, RSS growth, CPU time per stream and chats
+shed with 429. Client and server share the process, so CPU and memory
+include the client side (small next to the server).
+
+Run from ``backend/``:
+
+    PYTHONPATH=src python benchmarks/load_test.py --clients 50 --requests 5 --token-delay-ms 5
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import resource
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+
+import httpx
+import uvicorn
+
+from mock_llm import mock_model
+
+from agent.agent import get_agent
+from config.config import settings
+from main import app
+from services.admission import get_admission
+
+
+@dataclass
+class StreamStats:
+    ttft: float | None = None
+    duration: float = 0.0
+    events: int = 0
+    rejected: bool = False  # Shed by admission control (429)
+    errors: list[str] = field(default_factory=list)
+
+
+def rss_mb() -> float:
+    """Current resident set size (falls back to the peak where /proc is unavailable)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))]
+
+
+def start_server(args: argparse.Namespace) -> uvicorn.Server:
+    """Run the app in a thread whose context carries the model override."""
+    model = mock_model(
+        answer_tokens=args.tokens,
+        thinking_tokens=args.thinking_tokens,
+        token_delay=args.token_delay_ms / 1000,
+        tools=not args.no_tools,
+    )
+    get_admission().max_active = args.max_active
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+
+    def run() -> None:
+        with get_agent().override(model=model):
+            server.run()
+
+    threading.Thread(target=run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def chat(client: httpx.AsyncClient, client_id: str, prompt: str) -> StreamStats:
+    stats = StreamStats()
+    body = {"messages": [{"role": "user", "content": prompt}]}
+    headers = {settings.chat_client_header: client_id}
+    start = time.perf_counter()
+    event = None
+
+    async with client.stream("POST", "/api/v1/llm/chat", json=body, headers=headers) as response:
+        if response.status_code == 429:
+            stats.rejected = True
+            stats.duration = time.perf_counter() - start
+            return stats
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[7:]
+                stats.events += 1
+                if stats.ttft is None and event in ("content", "thinking"):
+                    stats.ttft = time.perf_counter() - start
+            elif line.startswith("data: ") and event == "error":
+                stats.errors.append(json.loads(line[6:]).get("content", ""))
+
+    stats.duration = time.perf_counter() - start
+    return stats
+
+
+async def run_clients(base_url: str, clients: int, requests: int) -> list[StreamStats]:
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as client:
+        async def worker(i: int) -> list[StreamStats]:
+            return [
+                await chat(client, f"load-test-{i}", f"client {i} request {r}: churn by contract?")
+                for r in range(requests)
+            ]
+
+        results = await asyncio.gather(*(worker(i) for i in range(clients)))
+    return [stats for per_client in results for stats in per_client]
+
+
+def report(results: list[StreamStats], wall: float, cpu: float, rss_before: float, rss_after: float) -> None:
+    rejected = sum(s.rejected for s in results)
+    results = [s for s in results if not s.rejected]
+    if not results:
+        print(f"All {rejected} chats rejected (429)")
+        return
+    ttfts = [s.ttft * 1000 for s in results if s.ttft is not None]
+    durations = [s.duration * 1000 for s in results]
+    events = sum(s.events for s in results)
+    errors = [e for s in results for e in s.errors]
+
+    print(f"Streams            {len(results)} in {wall:.2f} s ({len(results) / wall:.1f} streams/s)")
+    if ttfts:
+        print(
+            f"TTFT               p50 {percentile(ttfts, 50):8.1f} ms | p95 {percentile(ttfts, 95):8.1f} ms"
+            f" | p99 {percentile(ttfts, 99):8.1f} ms"
+        )
+    print(
+        f"Stream duration    p50 {percentile(durations, 50):8.1f} ms | p95 {percentile(durations, 95):8.1f} ms"
+        f" | mean {statistics.mean(durations):8.1f} ms"
+    )
+    print(f"Events             {events} ({events / wall:.0f} events/s)")
+    print(f"CPU per stream     {cpu / len(results) * 1000:.2f} ms")
+    print(f"RSS                {rss_before:.0f} MB -> {rss_after:.0f} MB ({rss_after - rss_before:+.1f} MB)")
+    if rejected:
+        print(f"Rejected (429)     {rejected}")
+    if errors:
+        print(f"Errors             {len(errors)} (first: {errors[0]!r})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent SSE clients")
+    parser.add_argument("--requests", type=int, default=5, help="Chats per client, back to back")
+    parser.add_argument("--tokens", type=int, default=200, help="Answer tokens per chat")
+    parser.add_argument("--thinking-tokens", type=int, default=50)
+    parser.add_argument("--token-delay-ms", type=float, default=0.0, help="Simulated decode time per token")
+    parser.add_argument("--no-tools", action="store_true", help="Skip the query_data/visualize round trips")
+    parser.add_argument(
+        "--max-active", type=int, default=0, help="Concurrent runs admitted by the server (0 = unlimited)"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    logging.getLogger("services.streaming").setLevel(logging.WARNING)  # One INFO line per chat
+    server = start_server(args)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    # Warm-up: first query, render workers, imports
+    asyncio.run(run_clients(base_url, 1, 1))
+
+    rss_before, cpu_before, start = rss_mb(), time.process_time(), time.perf_counter()
+    results = asyncio.run(run_clients(base_url, args.clients, args.requests))
+    wall, cpu = time.perf_counter() - start, time.process_time() - cpu_before
+
+    report(results, wall, cpu, rss_before, rss_mb())
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Deterministic stand-in for the LLM, for load tests and benchmarks.
+
+`mock_model()` returns a pydantic-ai ``FunctionModel`` that replays the
+shape of a typical analysis turn without any network call:
+
+1. a ``<thinking>`` preamble streamed token by token, then a ``query_data`` call
+2. a ``visualize`` call on the query result
+3. the final answer streamed token by token
+
+Token text is drawn from a fixed vocabulary with a seeded RNG, so a given
+configuration always produces the same stream. Use it with
+``get_agent().override(model=mock_model(...))``.
+"""
+
+import asyncio
+import json
+import random
+from collections.abc import AsyncIterator
+
+from pydantic_ai.messages import ModelMessage, ToolReturnPart
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, FunctionModel
+
+_VOCABULARY = (
+    "the customers on month-to-month contracts churn more often than those on "
+    "one or two year plans while monthly charges rise with fiber optic service "
+    "and tenure lowers the churn rate across every payment method"
+).split()
+
+QUERY_SQL = (
+    "SELECT Contract, Churn, COUNT(*) AS n, AVG(MonthlyCharges) AS avg_charges "
+    "FROM telcoclient GROUP BY Contract, Churn ORDER BY Contract, Churn"
+)
+VISUALIZE_CODE = "fig = px.bar(df, x='Contract', y='n', color='Churn', barmode='group')"
+
+
+def tokens(count: int, seed: int) -> list[str]:
+    """*count* word tokens (with their leading space), deterministic for *seed*."""
+    rng = random.Random(seed)
+    return [" " + rng.choice(_VOCABULARY) for _ in range(count)]
+
+
+def mock_model(
+    answer_tokens: int = 200,
+    thinking_tokens: int = 50,
+    token_delay: float = 0.0,
+    tools: bool = True,
+    seed: int = 0,
+) -> FunctionModel:
+    """Scripted streaming model; *token_delay* (seconds) paces each token like a real decoder."""
+
+    async def stream(messages: list[ModelMessage], info: AgentInfo) -> AsyncIterator[str | dict[int, DeltaToolCall]]:
+        returned = [p.tool_name for p in messages[-1].parts if isinstance(p, ToolReturnPart)]
+
+        if tools and not returned:
+            yield "<thinking>"
+            for token in tokens(thinking_tokens, seed):
+                await asyncio.sleep(token_delay)
+                yield token
+            yield "</thinking>"
+            args = {"sql": QUERY_SQL, "description": "Churn by contract"}
+            yield {0: DeltaToolCall(name="query_data", json_args=json.dumps(args), tool_call_id="call_query")}
+            return
+
+        if tools and returned == ["query_data"]:
+            args = {
+                "code": VISUALIZE_CODE,
+                "title": "Churn by contract",
+                "result_type": "figure",
+                "description": "Customers per contract type, split by churn",
+            }
+            yield {0: DeltaToolCall(name="visualize", json_args=json.dumps(args), tool_call_id="call_viz")}
+            return
+
+        for token in tokens(answer_tokens, seed + 1):
+            await asyncio.sleep(token_delay)
+            yield token
+
+    return FunctionModel(stream_function=stream, model_name="mock")
@@ -0,0 +1,77 @@
+"""Production server: one uvicorn worker per core, sharing a single copy of the datasets.
+
+    gunicorn -c gunicorn.conf.py
+
+Before the workers start, the CSVs are converted once to the Parquet cache
+(``python -m data.materialize``), and a watcher process keeps it in sync.
+Workers run with ``DATA_SHARED=true``: they only attach those files as
+DuckDB views, so the data lives once on disk and once in the OS page
+cache, whatever the worker count. The app is imported before forking;
+its singletons are built lazily, in each worker.
+
+Prometheus metrics run in multiprocess mode: workers write them to
+``PROMETHEUS_MULTIPROC_DIR``, emptied when this file is read (before the
+app is preloaded) and removed on exit, and ``/metrics`` aggregates every
+worker's, whichever one answers the scrape.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+_cores = os.cpu_count() or 1
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", _cores))
+worker_class = "uvicorn.workers.UvicornWorker"
+pythonpath = "src"
+wsgi_app = "main:app"
+preload_app = True
+
+# Read by the app's settings, which the workers inherit from the preloaded app
+os.environ["DATA_SHARED"] = "true"
+# Split the cores between the workers' DuckDB and render pools instead of giving each all of them
+os.environ.setdefault("QUERY_THREADS", str(max(_cores // workers, 1)))
+os.environ.setdefault("VISUALIZE_WORKERS", str(max(_cores // workers, 1)))
+# Must exist before the preloaded app creates its metrics, and be empty: files of a previous run would be summed
+_metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus-multiproc"),
+)
+shutil.rmtree(_metrics_dir, ignore_errors=True)
+os.makedirs(_metrics_dir)
+
+_materializer: subprocess.Popen | None = None
+
+
+def _materialize(*args: str) -> list[str]:
+    return [sys.executable, "-m", "data.materialize", *args]
+
+
+def _env() -> dict[str, str]:
+    return {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, ["src", os.environ.get("PYTHONPATH")]))}
+
+
+def on_starting(server) -> None:
+    server.log.info("Materializing datasets")
+    subprocess.run(_materialize(), env=_env(), check=True)
+
+
+def when_ready(server) -> None:
+    global _materializer
+    _materializer = subprocess.Popen(_materialize("--watch"), env=_env())
+
+
+def child_exit(server, worker) -> None:
+    from prometheus_client import multiprocess
+
+    # Drops the live gauges of the dead worker; its counters and histograms are kept
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server) -> None:
+    if _materializer is not None:
+        _materializer.terminate()
+        _materializer.wait()
+    shutil.rmtree(_metrics_dir, ignore_errors=True)
@@ -1,46 +1,70 @@
-import os
+import hashlib
 import logging
+from functools import cache
+from urllib.parse import urlparse
 
 from pydantic_ai import Agent, RunContext
+from pydantic_ai.settings import ModelSettings
 
 from config.config import settings
 from agent.context import AgentContext
-from agent.prompt import get_system_prompt
+from agent.llm import get_model
+from agent.prompt import SYSTEM_PROMPT, get_datasets_prompt
+from agent.tools.catalog import describe_table, list_tables
 from agent.tools.query_data import query_data
 from agent.tools.visualize import visualize
 
 log = logging.getLogger(__name__)
 
 
-def _setup_env(model: str) -> None:
-    """Point the openai SDK at our configured base URL if using an OpenAI-compatible provider."""
+def _prompt_cache_settings(model: str) -> ModelSettings:
+    """Provider-side prompt caching of the constant prompt prefix (instructions, tools).
+
+    Anthropic needs explicit ``cache_control`` breakpoints. OpenAI caches
+    long prefixes by itself; a ``prompt_cache_key`` shared by all requests
+    with this prefix improves hit rates, but is only sent to OpenAI itself
+    since other compatible servers may reject unknown fields (local ones
+    such as llama.cpp, vLLM or Ollama reuse a stable prefix on their own).
+    """
+    if not settings.llm_prompt_cache:
+        return {}
     provider = model.split(":", 1)[0].lower()
-    if provider == "openai":
-        os.environ["OPENAI_BASE_URL"] = settings.llm_base_url
-        os.environ["OPENAI_API_KEY"] = settings.llm_api_key or "ollama"
+    if provider == "anthropic":
+        return {
+            "anthropic_cache_tool_definitions": True,
+            "anthropic_cache_instructions": True,
+            "anthropic_cache": True,
+        }
+    if provider.startswith("openai") and urlparse(settings.llm_base_url).hostname == "api.openai.com":
+        return {"openai_prompt_cache_key": "chat-" + hashlib.sha256(SYSTEM_PROMPT.encode()).hexdigest()[:16]}
+    return {}
 
 
 def _build_agent(model: str) -> Agent[AgentContext]:
     log.info("Creating agent – model: %s", model)
 
     agent: Agent[AgentContext] = Agent(
-        model=model,
+        model=get_model(),
         deps_type=AgentContext,
+        instructions=SYSTEM_PROMPT,
+        model_settings=_prompt_cache_settings(model),
         retries=3,
     )
 
-    @agent.system_prompt
-    async def system_prompt(ctx: RunContext[AgentContext]) -> str:
-        return get_system_prompt(ctx.deps.dataset_info)
+    # Dynamic instructions follow the static ones, which carry the Anthropic cache breakpoint.
+    # Instructions are rendered on every run and never read back from session histories.
+    @agent.instructions
+    async def datasets_prompt(ctx: RunContext[AgentContext]) -> str:
+        return get_datasets_prompt(ctx.deps.dataset_info)
 
     agent.tool(query_data)
     agent.tool(visualize)
+    agent.tool(list_tables)
+    agent.tool(describe_table)
     return agent
 
 
-_setup_env(settings.llm_model)
-_agent = _build_agent(settings.llm_model)
-
-
+@cache
 def get_agent() -> Agent[AgentContext]:
-    return _agent
+    """The process' agent, built on first use (its HTTP client must not cross a fork)."""
+    return _build_agent(settings.llm_model)
@@ -1,14 +1,20 @@
 from dataclasses import dataclass, field
 from typing import Optional
 
-import pandas as pd
+from data.engine import DuckDBEngine
+from data.query_cache import QueryCache
+from data.result import QueryResult
 
 
 @dataclass
 class AgentContext:
     """Dependency bag passed to every tool call via PydanticAI."""
 
-    datasets: dict[str, pd.DataFrame] = field(default_factory=dict)
+    engine: DuckDBEngine
     dataset_info: str = ""
+    # Shared SQL result cache (None disables caching)
+    query_cache: Optional[QueryCache] = None
     # Set by query_data, read by visualize
-    current_dataframe: Optional[pd.DataFrame] = None
+    current_result: Optional[QueryResult] = None
+    # Names of the artifacts stored by visualize during the run
+    artifacts: list[str] = field(default_factory=list)
@@ -0,0 +1,218 @@
+"""The LLM model and the HTTP client behind it, shared by every agent of the process.
+
+All LLM traffic goes through one pooled, keep-alive `httpx.AsyncClient`
+(HTTP/2 where the backend negotiates it over TLS), instead of a client
+per agent. With several OpenAI-compatible backends serving the model
+(``LLM_BASE_URL`` plus ``LLM_BASE_URLS``, e.g. several Ollama nodes), its
+transport sends each request to the healthy backend with the fewest
+requests in flight and fails over to another one when a backend cannot
+be reached, so throughput grows with the number of inference nodes.
+"""
+
+import asyncio
+import itertools
+import logging
+from collections.abc import AsyncIterator, Callable
+from functools import cache
+
+import httpx
+from pydantic_ai.models import Model
+from pydantic_ai.models.openai import OpenAIChatModel, OpenAIResponsesModel
+from pydantic_ai.providers.openai import OpenAIProvider
+
+from config.config import settings
+from services.metrics import LLM_BACKEND_INFLIGHT, LLM_BACKEND_UP, LLM_FAILOVERS
+
+log = logging.getLogger(__name__)
+
+# Statuses of an overloaded or restarting backend: the request is worth sending elsewhere
+_RETRY_ELSEWHERE = {502, 503, 504}
+_HEALTH_TIMEOUT = 5.0
+
+
+class Backend:
+    """One OpenAI-compatible server, with its in-flight request count and health."""
+
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.outstanding = 0
+        self.healthy = True
+        LLM_BACKEND_UP.labels(self.base_url).set(1)
+
+    def acquire(self) -> None:
+        self.outstanding += 1
+        LLM_BACKEND_INFLIGHT.labels(self.base_url).inc()
+
+    def release(self) -> None:
+        self.outstanding -= 1
+        LLM_BACKEND_INFLIGHT.labels(self.base_url).dec()
+
+    def mark(self, healthy: bool, reason: str = "") -> None:
+        if healthy != self.healthy:
+            log.log(logging.INFO if healthy else logging.WARNING,
+                    "LLM backend %s is %s%s", self.base_url, "up" if healthy else "down",
+                    f": {reason}" if reason else "")
+        self.healthy = healthy
+        LLM_BACKEND_UP.labels(self.base_url).set(int(healthy))
+
+
+class BalancedTransport(httpx.AsyncBaseTransport):
+    """Spread requests made against the first backend's URL over all *backends*.
+
+    Each request goes to the healthy backend with the fewest requests in
+    flight (a streamed response counts until it is closed), ties taking
+    turns. A backend that refuses the connection or answers 502/503/504 is
+    marked down and the request is sent to the next one, as long as some
+    are left; health checks (`check_health`) bring it back.
+    """
+
+    def __init__(self, backends: list[Backend], transport: httpx.AsyncBaseTransport) -> None:
+        self.backends = backends
+        self._transport = transport
+        self._turn = itertools.count()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        primary = self.backends[0].base_url
+        if not url.startswith(primary):
+            return await self._transport.handle_async_request(request)
+
+        path = url[len(primary):]
+        tried: list[Backend] = []
+        while True:
+            backend = self._pick(tried)
+            tried.append(backend)
+            request.url = httpx.URL(backend.base_url + path)
+            request.headers["Host"] = request.url.netloc.decode("ascii")
+            backend.acquire()
+            last = len(tried) == len(self.backends)
+            try:
+                response = await self._transport.handle_async_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as exc:
+                backend.release()
+                backend.mark(False, str(exc) or type(exc).__name__)
+                if last:
+                    raise
+                LLM_FAILOVERS.labels(backend.base_url).inc()
+                continue
+
+            if response.status_code in _RETRY_ELSEWHERE and not last:
+                await response.aclose()
+                backend.release()
+                backend.mark(False, f"HTTP {response.status_code}")
+                LLM_FAILOVERS.labels(backend.base_url).inc()
+                continue
+            response.stream = _ReleasingStream(response.stream, backend.release)
+            return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+    async def check_health(self, headers: dict[str, str]) -> None:
+        """Probe ``GET {base_url}/models`` on every backend and update their health."""
+        async def probe(backend: Backend) -> None:
+            request = httpx.Request(
+                "GET", backend.base_url + "/models", headers=headers,
+                extensions={"timeout": httpx.Timeout(_HEALTH_TIMEOUT).as_dict()},
+            )
+            try:
+                response = await self._transport.handle_async_request(request)
+                await response.aclose()
+            except httpx.HTTPError as exc:
+                backend.mark(False, str(exc) or type(exc).__name__)
+            else:
+                backend.mark(response.status_code < 500, f"HTTP {response.status_code}")
+
+        await asyncio.gather(*(probe(backend) for backend in self.backends))
+
+    def _pick(self, tried: list[Backend]) -> Backend:
+        candidates = [b for b in self.backends if b not in tried]
+        healthy = [b for b in candidates if b.healthy] or candidates  # All marked down: try anyway
+        fewest = min(b.outstanding for b in healthy)
+        ties = [b for b in healthy if b.outstanding == fewest]
+        return ties[next(self._turn) % len(ties)]
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that calls *on_close* once, when the response is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[], None]) -> None:
+        self._stream = stream
+        self._on_close: Callable[[], None] | None = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close is not None:
+                self._on_close()
+                self._on_close = None
+
+
+def _backends() -> list[Backend]:
+    urls = dict.fromkeys(url.rstrip("/") for url in [settings.llm_base_url, *settings.llm_base_urls])
+    return [Backend(url) for url in urls]
+
+
+@cache
+def _transport() -> httpx.AsyncBaseTransport:
+    limits = httpx.Limits(
+        max_connections=settings.llm_pool_size,
+        max_keepalive_connections=settings.llm_pool_size,
+        keepalive_expiry=settings.llm_keepalive_seconds,
+    )
+    transport = httpx.AsyncHTTPTransport(http2=settings.llm_http2, limits=limits)
+    backends = _backends()
+    if len(backends) == 1:
+        return transport
+    log.info("LLM backends: %s", ", ".join(b.base_url for b in backends))
+    return BalancedTransport(backends, transport)
+
+
+@cache
+def get_http_client() -> httpx.AsyncClient:
+    """The process' LLM HTTP client, built on first use (after fork)."""
+    return httpx.AsyncClient(transport=_transport(), timeout=None)  # The SDKs set timeouts per request
+
+
+@cache
+def get_model(model: str = "") -> Model | str:
+    """*model* (default: ``settings.llm_model``), on the shared HTTP client.
+
+    OpenAI(-compatible) and Anthropic models are built here; any other
+    provider is left for pydantic-ai to build from the model string.
+    """
+    model = model or settings.llm_model
+    provider, _, name = model.partition(":")
+    if provider in ("openai", "openai-chat", "openai-responses"):
+        client = OpenAIProvider(
+            base_url=settings.llm_base_url,
+            api_key=settings.llm_api_key or "ollama",
+            http_client=get_http_client(),
+        )
+        model_class = OpenAIResponsesModel if provider == "openai-responses" else OpenAIChatModel
+        return model_class(name, provider=client)
+    if provider == "anthropic":
+        from pydantic_ai.models.anthropic import AnthropicModel  # Optional, like the anthropic SDK
+        from pydantic_ai.providers.anthropic import AnthropicProvider
+
+        return AnthropicModel(name, provider=AnthropicProvider(http_client=get_http_client()))
+    return model
+
+
+async def check_backends_periodically(interval: float) -> None:
+    """Health-check the LLM backends every *interval* seconds until cancelled (no-op with one)."""
+    transport = _transport()
+    if not isinstance(transport, BalancedTransport):
+        return
+    headers = {"Authorization": f"Bearer {settings.llm_api_key}"} if settings.llm_api_key else {}
+    while True:
+        try:
+            await transport.check_health(headers)
+        except Exception as exc:
+            log.error("LLM health check failed: %s", exc, exc_info=True)
+        await asyncio.sleep(interval)
@@ -0,0 +1,65 @@
+import asyncio
+
+from pydantic_ai import RunContext
+
+from agent.context import AgentContext
+from data.loader import format_dataset_info, get_info
+from data.profile import format_profile, get_profile_store
+from data.schema_index import get_schema_index
+from services.metrics import observe_tool
+
+# Tables listed per list_tables call
+_MAX_LISTED = 50
+
+
+async def list_tables(
+    ctx: RunContext[AgentContext],
+    search: str = "",
+) -> str:
+    """List the available datasets (SQL tables), optionally ranked by relevance.
+
+    Args:
+        ctx: Injected context.
+        search: Optional keywords (e.g. "customer churn contract"). Matching tables come first.
+    """
+    with observe_tool("list_tables"):
+        by_name = {ds["name"]: ds for ds in get_info()}
+        if not by_name:
+            return "Error: No datasets loaded."
+
+        names = list(by_name)
+        header = f"{len(names)} tables"
+        if search:
+            if matches := await asyncio.to_thread(get_schema_index().search, search, _MAX_LISTED):
+                names = matches
+                header = f"{len(matches)} of {len(by_name)} tables match '{search}', best first"
+            else:
+                header = f"No table matches '{search}'. All {len(by_name)} tables"
+        if len(names) > _MAX_LISTED:
+            header += f" (first {_MAX_LISTED} shown, narrow down with `search`)"
+
+        lines = [
+            f"- {name}: {by_name[name]['rows']} rows, {by_name[name]['columns']} columns"
+            for name in names[:_MAX_LISTED]
+        ]
+        return header + ":\n" + "\n".join(lines)
+
+
+async def describe_table(
+    ctx: RunContext[AgentContext],
+    name: str,
+) -> str:
+    """Describe the columns of a table: types, ranges, null ratio and frequent values.
+
+    Args:
+        ctx: Injected context.
+        name: Table name, as returned by `list_tables`.
+    """
+    with observe_tool("describe_table"):
+        ds = next((ds for ds in get_info() if ds["name"] == name.lower()), None)
+        if ds is None:
+            return f"Error: Unknown table '{name}'. Call list_tables to see the available tables."
+        try:
+            return format_profile(await asyncio.to_thread(get_profile_store().get, ds["name"]))
+        except Exception:
+            return format_dataset_info(ds)
@@ -0,0 +1,153 @@
+"""Thinning of oversized point traces, after the plotting code has run.
+
+A figure with hundreds of thousands of points is slow to serialize, send
+and draw, and shows no more than a few thousand points would. Plotting
+code always gets every row, so whatever it aggregates (histograms, bar
+totals, groupbys) stays exact; only then does `thin_figure` reduce the
+traces that draw one mark per row, scatter and line traces:
+
+- lines over a sorted x axis: LTTB, keeping the curve's shape
+- markers over two numeric (or temporal) axes: one point per cell of a
+  grid, keeping the extent and outliers but not the density
+
+Other traces, and point traces matching neither case, are left as they
+are. Like `render`, this only depends on plotly/pandas/numpy, so render
+workers can import it without loading the app.
+"""
+
+import math
+import re
+
+import numpy as np
+import pandas as pd
+from plotly.basedatatypes import BaseFigure, BaseTraceType
+
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+# Trace types drawing one mark per input row
+_POINT_TRACES = ("scatter", "scattergl")
+
+
+def thin_figure(fig: BaseFigure, max_points: int) -> str | None:
+    """Thin the point traces of *fig* in place to about *max_points* points in all.
+
+    Returns how the figure was thinned, or None if it was left as is.
+    """
+    traces = [trace for trace in fig.data if trace.type in _POINT_TRACES]
+    before = sum(_length(trace) for trace in traces)
+    if max_points <= 0 or before <= max_points:
+        return None
+
+    budget = max(max_points // len(traces), 3)
+    methods: set[str] = set()
+    after = 0
+    for trace in traces:
+        n = _length(trace)
+        selected = _select(trace, n, budget) if n > budget else None
+        if selected is None:
+            after += n
+            continue
+        keep, method = selected
+        trace.update(_subset(trace.to_plotly_json(), keep, n))
+        methods.add(method)
+        after += len(keep)
+
+    if not methods:
+        return None
+    return f"{before:,} points of scatter/line traces thinned to {after:,} ({', '.join(sorted(methods))})"
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the *n_out* points of the series (x, y) kept by Largest-Triangle-Three-Buckets.
+
+    *x* must be sorted. The first and last points are always kept; in
+    between, each bucket keeps the point forming the largest triangle
+    with the previously kept point and the average of the next bucket.
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])[:max(n_out, 0)]
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out - 2 buckets between the ends
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        kept[i + 1] = a
+    return kept
+
+
+def _length(trace: BaseTraceType) -> int:
+    values = trace.x if trace.x is not None else trace.y
+    return 0 if values is None else len(values)
+
+
+def _select(trace: BaseTraceType, n: int, budget: int) -> tuple[np.ndarray, str] | None:
+    """Positions of the points of *trace* to keep, and the method used; None to keep them all."""
+    x = np.arange(n, dtype=float) if trace.x is None else _axis_values(trace.x)
+    y = _axis_values(trace.y)
+    if x is None or y is None or len(x) != n or len(y) != n:
+        return None
+
+    if "lines" in (trace.mode or "lines"):  # Plotly draws lines by default past 20 points
+        if not np.all(np.diff(x) >= 0):  # Unsorted (or NaN) x: the line's path would change
+            return None
+        return lttb(x, y, budget), "LTTB for lines"
+
+    bins = max(int(math.sqrt(budget)), 1)
+    return _grid_thin(x, y, bins), f"one marker per cell of a {bins}x{bins} grid"
+
+
+def _axis_values(values) -> np.ndarray | None:
+    """*values* as floats (datetimes as nanoseconds, NaN where missing), or None if categorical."""
+    if values is None:
+        return None
+    array = np.asarray(values)
+    if array.dtype.kind in "iuf":
+        return array.astype(float)
+    if array.dtype.kind == "M" or (array.dtype.kind in "OU" and _is_temporal(array)):
+        as_time = pd.to_datetime(pd.Series(array), format="ISO8601", errors="coerce", utc=True)
+        return np.where(as_time.isna(), np.nan, as_time.to_numpy(dtype="datetime64[ns]").astype(np.int64))
+    return None
+
+
+def _is_temporal(values: np.ndarray) -> bool:
+    head = [v for v in values[:20] if v is not None]
+    return bool(head) and all(hasattr(v, "year") or (isinstance(v, str) and _ISO_DATE.match(v)) for v in head)
+
+
+def _subset(props: dict, keep: np.ndarray, n: int) -> dict:
+    """The per-point properties of a trace (any array of length *n*, nested ones included) at *keep*."""
+    updates = {}
+    for key, value in props.items():
+        if isinstance(value, dict):
+            if nested := _subset(value, keep, n):
+                updates[key] = nested
+        elif isinstance(value, np.ndarray) and len(value) == n:
+            updates[key] = value[keep]
+        elif isinstance(value, (list, tuple)) and len(value) == n:
+            updates[key] = [value[i] for i in keep]
+    return updates
+
+
+def _grid_thin(x: np.ndarray, y: np.ndarray, bins: int) -> np.ndarray:
+    """Position of the first point of each occupied cell of a *bins* x *bins* grid over (x, y)."""
+    cells = _bin(x, bins) * (bins + 1) + _bin(y, bins)
+    _, first = np.unique(cells, return_index=True)
+    return np.sort(first)
+
+
+def _bin(values: np.ndarray, bins: int) -> np.ndarray:
+    """Grid cell of each value along one axis; NaNs share an extra cell."""
+    missing = np.isnan(values)
+    present = values[~missing]
+    lo, hi = (present.min(), present.max()) if present.size else (0.0, 0.0)
+    span = hi - lo if hi > lo else 1.0
+    cells = np.minimum(((np.where(missing, lo, values) - lo) / span * bins).astype(np.int64), bins - 1)
+    return np.where(missing, bins, cells)
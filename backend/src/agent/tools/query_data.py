@@ -1,38 +1,135 @@
+import math
+from pathlib import Path
+
 import duckdb
 from pydantic_ai import RunContext
 
+from config.config import settings
 from agent.context import AgentContext
+from data.engine import SAMPLE_SCHEMA, DuckDBEngine
+from data.query_cache import QueryCache
+from data.result import BATCH_ROWS, QueryResult, fetch_bounded
+from services.metrics import QUERY_BYTES, QUERY_ROWS, observe_tool
 
 
 async def query_data(
     ctx: RunContext[AgentContext],
     sql: str,
     description: str,
+    sampled: bool = False,
 ) -> str:
     """Execute a SQL query against the loaded datasets.
 
     Args:
-        ctx: Injected context with loaded datasets.
-        sql: SQL query to execute. Table names correspond to dataset names.
+        ctx: Injected context with the shared DuckDB engine.
+        sql: One SELECT query to execute (data is read-only). Table names correspond to dataset names.
         description: Short description of what this query does.
+        sampled: Run on a fixed random sample of each large table: much faster, but approximate.
+                 For exploratory questions (distributions, shapes, rough shares); keep False
+                 for exact figures and for joins between large tables.
     """
-    if not ctx.deps.datasets:
+    if not ctx.deps.engine.tables:
         return "Error: No datasets loaded."
 
     try:
-        with duckdb.connect(database=":memory:") as conn:
-            for name, df in ctx.deps.datasets.items():
-                conn.register(name, df)
-            result_df = conn.execute(sql).fetchdf()
-
-        ctx.deps.current_dataframe = result_df
-
-        preview = result_df.head(5).to_string(index=False)
+        with observe_tool("query_data"):
+            result, cached, samples = await ctx.deps.engine.run(
+                lambda cur: _execute(cur, sql, ctx.deps.query_cache, ctx.deps.engine if sampled else None),
+                timeout=settings.query_timeout,
+            )
+    except TimeoutError:
         return (
-            f"Query executed successfully.\n"
-            f"Result: {result_df.shape[0]} rows x {result_df.shape[1]} columns\n"
-            f"Columns: {', '.join(result_df.columns.tolist())}\n"
-            f"Preview:\n{preview}"
+            f"Error: Query timed out after {settings.query_timeout:g}s and was cancelled.\n"
+            "Retry with a cheaper query: filter rows early, aggregate, add a LIMIT or avoid cross joins."
         )
     except Exception as e:
         return f"Error executing SQL: {e}"
+
+    QUERY_ROWS.observe(result.rows)
+    QUERY_BYTES.observe(result.nbytes)
+
+    if ctx.deps.current_result is not None:
+        ctx.deps.current_result.discard()
+    ctx.deps.current_result = result
+
+    preview = result.preview.to_pandas().to_string(index=False)
+    spill_note = (
+        f"Note: result exceeds the in-memory budget ({settings.query_max_rows} rows / "
+        f"{settings.query_max_bytes} bytes) and was kept on disk. Prefer aggregating in SQL.\n"
+        if result.spill_path is not None else ""
+    )
+    if samples:
+        status = "APPROXIMATE result from a random sample"
+    elif sampled:
+        status = "Exact result (tables are small enough to scan in full, nothing was sampled)"
+    else:
+        status = "Query executed successfully"
+    return (
+        f"{status}{' (cached result)' if cached else ''}.\n"
+        f"{_sample_note(samples)}"
+        f"Result: {result.rows} rows x {len(result.columns)} columns\n"
+        f"Columns: {', '.join(result.columns)}\n"
+        f"{spill_note}"
+        f"Preview:\n{preview}"
+    )
+
+
+def _execute(
+    cur: duckdb.DuckDBPyConnection,
+    sql: str,
+    cache: QueryCache | None,
+    sample_engine: DuckDBEngine | None = None,
+) -> tuple[QueryResult, bool, dict[str, tuple[int, int]]]:
+    """Run the single SELECT *sql* within the result budget, serving it from *cache* when possible.
+
+    Anything else is rejected before it runs: the database is shared by
+    every request, so a DROP or UPDATE would break it for all of them.
+    With *sample_engine*, large tables are read from their reservoir sample
+    instead (the sample schema goes first on this cursor's search path).
+    Returns ``(result, cached, samples)``, *samples* mapping each sampled
+    table to ``(sample_rows, total_rows)``. Only results kept in memory are cached.
+    """
+    statements = duckdb.extract_statements(sql)
+    if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+        kinds = ", ".join(statement.type.name for statement in statements) or "none"
+        raise ValueError(f"only a single SELECT query is allowed (got: {kinds})")
+    cacheable = cache is not None
+    tables = {name.lower() for name in cur.get_table_names(sql)}
+
+    samples = {}
+    if sample_engine is not None:
+        for name in tables & sample_engine.tables:
+            if (sample := sample_engine.sample(cur, name, settings.query_sample_rows)) is not None:
+                samples[name] = sample
+        if samples:
+            cur.execute(f"SET search_path = '{SAMPLE_SCHEMA},main'")
+
+    if cacheable:
+        key = cache.key(sql, tables, mode="sampled" if samples else "exact")
+        if (table := cache.get(key)) is not None:
+            return QueryResult.from_table(table), True, samples
+
+    result = fetch_bounded(
+        cur.execute(sql).fetch_record_batch(BATCH_ROWS),
+        max_rows=settings.query_max_rows,
+        max_bytes=settings.query_max_bytes,
+        spill_dir=Path(settings.query_spill_dir),
+    )
+    if cacheable and result.table is not None:
+        cache.put(key, result.table)
+    return result, False, samples
+
+
+def _sample_note(samples: dict[str, tuple[int, int]]) -> str:
+    """How the sample relates to the full data: fraction, scale-up factor and 95% margin of error."""
+    lines = []
+    for name, (n, total) in sorted(samples.items()):
+        # Worst-case (p = 0.5) margin of a proportion, with finite population correction
+        margin = 1.96 * math.sqrt(0.25 / n * (total - n) / (total - 1))
+        lines.append(
+            f"- {name}: {n:,} of {total:,} rows ({n / total:.2%}). Multiply COUNT/SUM by {total / n:,.1f} "
+            f"to estimate totals; shares and proportions are within ±{margin * 100:.2f} percentage points (95% confidence)."
+        )
+    if len(samples) > 1:
+        lines.append("- Several tables were sampled independently: joins between them miss most matches.")
+    return "Sampled tables:\n" + "\n".join(lines) + "\n" if lines else ""
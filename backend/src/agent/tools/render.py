@@ -0,0 +1,167 @@
+"""Execution of LLM-written plotting code, shared by both `visualize` modes.
+
+This module only depends on pandas/plotly/pyarrow (and the app-independent
+artifact encoding and figure thinning) so worker processes can import it
+without loading the app (datasets, agent, settings). Artifacts are
+returned, not stored: the parent process owns the artifact store.
+"""
+
+import os
+import signal
+from collections.abc import Iterator
+from contextlib import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Literal
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import pyarrow as pa
+
+from agent.tools.downsample import thin_figure
+from services.artifacts import Artifact, encode
+
+# Worker side: where each job reports the pid running it (set by `init_worker`)
+_started = None
+# Environment variables render workers keep; the others (API keys, AWS credentials...) are dropped
+_WORKER_ENV = {"PATH", "HOME", "LANG", "TZ", "TMPDIR", "TEMP", "TMP", "PYTHONPATH", "PYTHONHASHSEED"}
+
+
+def render(
+    df: pd.DataFrame,
+    code: str,
+    title: str,
+    result_type: Literal["figure", "table"],
+    max_points: int = 0,
+) -> tuple[str, list[Artifact]]:
+    """Run *code* against *df* and encode the resulting figure or table.
+
+    The code always gets every row; scatter and line traces of the figure
+    over *max_points* points are thinned afterwards (see `thin_figure`).
+    Returns the tool result text for the agent and the artifacts to store.
+    """
+    namespace = {"df": df, "pd": pd, "px": px, "go": go}
+
+    try:
+        exec(code, namespace)
+    except MemoryError:
+        raise
+    except Exception as e:
+        return f"Code execution error: {e}", []
+
+    if result_type == "figure":
+        fig = namespace.get("fig")
+        if fig is None:
+            return "Error: Code must create a 'fig' variable (plotly Figure).", []
+
+        thinned = thin_figure(fig, max_points)
+        artifact = encode(fig.to_json().encode(), ".json")
+        thinned_note = f"\nThinned for display: {thinned}." if thinned else ""
+        return (
+            f"Figure created: {title}\n"
+            f"Saved to: output/{Path(artifact.name).stem}.html\n"
+            f"Type: {type(fig).__name__}\n"
+            f"Traces: {len(fig.data)}"
+            f"{thinned_note}"
+        ), [artifact]
+
+    if result_type == "table":
+        result = namespace.get("result", df)
+        artifact = encode(result.to_csv(index=False).encode(), ".csv")
+        return (
+            f"Table created: {title}\n"
+            f"Saved to: output/{artifact.name}\n"
+            f"Shape: {result.shape[0]} rows x {result.shape[1]} columns\n"
+            f"Preview:\n{result.head(10).to_string(index=False)}"
+        ), [artifact]
+
+    return f"Error: Unknown result_type '{result_type}'. Use 'figure' or 'table'.", []
+
+
+#  Worker-process side
+
+
+def init_worker(memory_limit_mb: int, started) -> None:
+    """Process-pool initializer: cap the worker's heap so a runaway plot fails alone.
+
+    Jobs report ``(job, pid)`` on the *started* queue, so that the parent
+    can kill the worker of a job that overruns. Plotting code gets frames
+    read without copying from shared memory; copy-on-write (always on from
+    pandas 3) keeps its edits off that data. The environment is reduced to
+    `_WORKER_ENV` (and locale variables) before any plotting code runs.
+    """
+    global _started
+    _started = started
+    for name in list(os.environ):
+        if name not in _WORKER_ENV and not name.startswith("LC_"):
+            del os.environ[name]
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+
+def warm_up() -> None:
+    """No-op task; importing this module already loaded pandas and plotly."""
+
+
+def render_shared(
+    job: int,
+    source: str,
+    code: str,
+    title: str,
+    result_type: Literal["figure", "table"],
+    timeout: float,
+    max_points: int = 0,
+) -> tuple[str, list[Artifact]]:
+    """Worker entry point: load the data from *source*, then `render` within *timeout*.
+
+    *source* is either ``shm:<name>:<size>`` (an Arrow IPC stream in shared
+    memory, read without copying) or the path of a spilled Parquet result.
+    """
+    _started.put((job, os.getpid()))
+    try:
+        with _time_limit(timeout):
+            if not source.startswith("shm:"):
+                return render(pd.read_parquet(source), code, title, result_type, max_points)
+
+            _, name, size = source.split(":")
+            shm = SharedMemory(name=name)
+            try:
+                table = pa.ipc.open_stream(pa.py_buffer(shm.buf[: int(size)])).read_all()
+                return render(table.to_pandas(), code, title, result_type, max_points)
+            finally:
+                table = None
+                try:
+                    shm.close()
+                except BufferError:  # A zero-copy column still references the segment
+                    pass
+    except _TimeLimitExceeded:
+        return f"Code execution error: visualization exceeded the {timeout:g}s time limit.", []
+    except MemoryError:
+        return "Code execution error: visualization exceeded the worker memory limit.", []
+
+
+class _TimeLimitExceeded(BaseException):
+    """Raised by SIGALRM; a BaseException so `render`'s `except Exception` lets it through."""
+
+
+@contextmanager
+def _time_limit(seconds: float) -> Iterator[None]:
+    def _raise(signum, frame):
+        raise _TimeLimitExceeded
+
+    previous = signal.signal(signal.SIGALRM, _raise)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
@@ -1,15 +1,14 @@
-import re
-from pathlib import Path
+import asyncio
 from typing import Literal
 
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from pydantic_ai import RunContext
 
+from config.config import settings
 from agent.context import AgentContext
-
-OUTPUT_DIR = Path("output")
+from agent.tools.render import render
+from services.artifact_store import get_artifact_store
+from services.metrics import observe_tool
+from services.render_pool import get_render_pool
 
 
 async def visualize(
@@ -22,7 +21,7 @@ async def visualize(
     """Create a visualization from the last query result.
 
     Args:
-        ctx: Injected context with current DataFrame.
+        ctx: Injected context with the last query result.
         code: Python code to create the visualization.
               Use `df` for the data, `px` for plotly.express,
               `go` for plotly.graph_objects, `pd` for pandas.
@@ -31,43 +30,19 @@ async def visualize(
         result_type: Either "figure" (Plotly chart) or "table" (formatted DataFrame).
         description: Description of what this visualization shows.
     """
-    if ctx.deps.current_dataframe is None:
+    if ctx.deps.current_result is None:
         return "Error: No data available. Call query_data first."
 
-    df = ctx.deps.current_dataframe
-    namespace = {"df": df.copy(), "pd": pd, "px": px, "go": go}
-
-    try:
-        exec(code, namespace)
-    except Exception as e:
-        return f"Code execution error: {e}"
-
-    safe_title = re.sub(r"[^\w\s-]", "", title).strip().replace(" ", "_").lower()
-    OUTPUT_DIR.mkdir(exist_ok=True)
-
-    if result_type == "figure":
-        fig = namespace.get("fig")
-        if fig is None:
-            return "Error: Code must create a 'fig' variable (plotly Figure)."
-
-        path = OUTPUT_DIR / f"{safe_title}.html"
-        fig.write_html(str(path))
-        return (
-            f"Figure created: {title}\n"
-            f"Saved to: {path}\n"
-            f"Type: {type(fig).__name__}\n"
-            f"Traces: {len(fig.data)}"
-        )
-
-    if result_type == "table":
-        result = namespace.get("result", df)
-        path = OUTPUT_DIR / f"{safe_title}.csv"
-        result.to_csv(str(path), index=False)
-        return (
-            f"Table created: {title}\n"
-            f"Saved to: {path}\n"
-            f"Shape: {result.shape[0]} rows x {result.shape[1]} columns\n"
-            f"Preview:\n{result.head(10).to_string(index=False)}"
-        )
-
-    return f"Error: Unknown result_type '{result_type}'. Use 'figure' or 'table'."
+    with observe_tool("visualize"):
+        if settings.visualize_mode == "process":
+            message, artifacts = await get_render_pool().render(ctx.deps.current_result, code, title, result_type)
+        else:
+            message, artifacts = render(
+                ctx.deps.current_result.to_pandas(), code, title, result_type, settings.visualize_max_points,
+            )
+
+        store = get_artifact_store()
+        for artifact in artifacts:
+            await asyncio.to_thread(store.put, artifact)
+            ctx.deps.artifacts.append(artifact.name)
+    return message
@@ -5,6 +5,9 @@ from .schemas import (
     SummarizeResponse,
     DatasetInfo,
     DatasetsResponse,
+    DatasetProfile,
+    QueryCacheStats,
+    ArtifactUsage,
     VersionResponse,
 )
 
@@ -15,5 +18,8 @@ __all__ = [
     "SummarizeResponse",
     "DatasetInfo",
     "DatasetsResponse",
+    "DatasetProfile",
+    "QueryCacheStats",
+    "ArtifactUsage",
     "VersionResponse",
 ]
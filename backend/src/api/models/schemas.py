@@ -14,7 +14,25 @@ class MessagePayload(BaseModel):
 
 class ChatRequest(BaseModel):
     messages: list[MessagePayload] = Field(
-        description="Full conversation history, oldest first. The last message is the new user prompt.",
+        description=(
+            "Conversation history, oldest first. The last message is the new user prompt. "
+            "With a known `conversation_id`, only the last message is used."
+        ),
+    )
+    conversation_id: str | None = Field(
+        None,
+        description=(
+            "Server-side session to continue (tool calls and results included). "
+            "Earlier messages seed the session when the server doesn't have it yet."
+        ),
+    )
+    resume: bool = Field(
+        False,
+        description=(
+            "Only the new prompt was sent, continuing the server-side session of `conversation_id`. "
+            "If the server doesn't hold that session (evicted, restarted, another worker), the chat "
+            "is refused with 409 rather than run without the earlier messages: resend them all."
+        ),
     )
 
 
@@ -37,12 +55,61 @@ class DatasetInfo(BaseModel):
     rows: int = Field(description="Number of rows in the dataset.")
     columns: int = Field(description="Number of columns in the dataset.")
     column_names: list[str] = Field(description="Ordered list of column headers.")
+    version: int = Field(description="Registry generation at which this dataset was last (re)loaded.")
 
 
 class DatasetsResponse(BaseModel):
+    generation: int = Field(description="Registry generation, bumped whenever a dataset is added, changed or removed.")
     datasets: list[DatasetInfo] = Field(description="Metadata for every loaded CSV.")
 
 
+class TopValue(BaseModel):
+    value: str = Field(description="Column value, as text.")
+    count: int = Field(description="Rows holding this value.")
+
+
+class ColumnProfile(BaseModel):
+    name: str = Field(description="Column name.")
+    dtype: str = Field(description="DuckDB column type.")
+    null_ratio: float = Field(description="Share of NULL values (0-1).")
+    min: str | None = Field(description="Smallest value, as text.")
+    max: str | None = Field(description="Largest value, as text.")
+    approx_distinct: int = Field(description="Approximate number of distinct values.")
+    top_values: list[TopValue] = Field(
+        description="Most frequent values of categorical columns (empty for continuous or identifier-like ones).",
+    )
+
+
+class DatasetProfile(BaseModel):
+    name: str = Field(description="Dataset (SQL table) name.")
+    version: int = Field(description="Registry generation of the profiled data.")
+    rows: int = Field(description="Number of rows in the dataset.")
+    columns: list[ColumnProfile] = Field(description="Per-column statistics, in table order.")
+
+
+class QueryCacheStats(BaseModel):
+    enabled: bool = Field(description="Whether query results are cached.")
+    entries: int = Field(0, description="Number of cached results.")
+    bytes: int = Field(0, description="Arrow bytes currently held.")
+    max_bytes: int = Field(0, description="Cache budget in bytes.")
+    hits: int = Field(0, description="Lookups served from the cache.")
+    misses: int = Field(0, description="Lookups that had to run the query.")
+    evictions: int = Field(0, description="Entries dropped to stay under the budget.")
+
+
+#  Output 
+
+
+class ArtifactUsage(BaseModel):
+    backend: str = Field(description="Storage backend ('local' or 's3').")
+    artifacts: int = Field(description="Number of stored plots/tables.")
+    bytes: int = Field(description="Compressed bytes stored (all encodings).")
+    max_bytes: int = Field(description="Quota; least recently used artifacts are evicted above it.")
+    ttl_seconds: float = Field(description="Artifacts older than this are evicted (0 = no TTL).")
+    evictions: int = Field(description="Artifacts evicted since startup.")
+    oldest_access: float | None = Field(None, description="Unix time of the least recently used artifact.")
+
+
 #  Version 
 
 
@@ -1,9 +1,10 @@
-import json
+import orjson
 
 
-def sse(event: str, data: dict) -> str:
-    """Format a Server-Sent Event frame with a JSON payload."""
-    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+def sse(event: str, data: dict, event_id: int | None = None) -> str:
+    """Format a Server-Sent Event frame with a JSON payload (and an ``id:`` for resumable streams)."""
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
 
 
 def sse_text(event: str, content: str) -> str:
@@ -1,12 +1,34 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, status
 
-from api.models import DatasetsResponse
-from data.loader import get_info
+from api.models import DatasetProfile, DatasetsResponse, QueryCacheStats
+from data.loader import get_generation, get_info
+from data.profile import get_profile_store
+from data.query_cache import get_query_cache
 
 router = APIRouter(prefix="/data", tags=["Datasets"])
 
 
 @router.get("", summary="List loaded datasets", response_model=DatasetsResponse)
 def list_datasets() -> DatasetsResponse:
-    """Return column info and row counts for every CSV that was loaded at startup."""
-    return DatasetsResponse(datasets=get_info())
+    """Return column info and row counts for every loaded CSV, plus the registry generation."""
+    return DatasetsResponse(generation=get_generation(), datasets=get_info())
+
+
+@router.get("/cache", summary="Query result cache counters", response_model=QueryCacheStats)
+def query_cache_stats() -> QueryCacheStats:
+    """Return hit/miss/eviction counters and memory use of the `query_data` result cache."""
+    cache = get_query_cache()
+    if cache is None:
+        return QueryCacheStats(enabled=False)
+    return QueryCacheStats(enabled=True, **cache.stats())
+
+
+@router.get("/{name}/profile", summary="Column statistics of a dataset", response_model=DatasetProfile)
+def dataset_profile(name: str) -> DatasetProfile:
+    """Return per-column type, null ratio, min/max, approximate distinct count and top values.
+
+    Computed with DuckDB `SUMMARIZE` on first request for each dataset version, then cached on disk.
+    """
+    if not any(ds["name"] == name for ds in get_info()):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Dataset '{name}' not found")
+    return DatasetProfile(**get_profile_store().get(name))
@@ -1,11 +1,14 @@
+import asyncio
 import logging
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, HTTPException, Request, status
 from fastapi.responses import StreamingResponse
-from pydantic_ai import Agent
 
 from api.models import ChatRequest, SummarizeRequest, SummarizeResponse
-from services.streaming import stream_chat
+from services.admission import QueueFull, get_admission
+from services.runs import AgentRun, EventsExpired, get_run_registry
+from services.sessions import get_session_store
+from services.titles import get_title_service
 from config.config import settings
 
 log = logging.getLogger(__name__)
@@ -13,17 +16,6 @@ log = logging.getLogger(__name__)
 router = APIRouter(prefix="/llm", tags=["LLM"])
 
 
-#  Summarizer (reused across requests) 
-
-_summarizer = Agent(
-    model=settings.llm_model,
-    system_prompt=(
-        "You generate very short titles (maximum 5 words) that summarize a user message. "
-        "Reply ONLY with the title. No quotes, no punctuation at the end, no explanation."
-    ),
-)
-
-
 #  Routes 
 
 
@@ -32,31 +24,105 @@ _summarizer = Agent(
     summary="Chat (SSE stream)",
     description=(
         "Send a conversation and receive the agent's reply as a Server-Sent Event stream. "
-        "Events: `content`, `thinking`, `tool_call`, `tool_result`, `error`, `Done`."
+        "Events: `queued` (position while waiting for a slot, 0 once started), `content`, `thinking`, "
+        "`tool_call`, `tool_result`, `error`, `Done`. "
+        "The run continues if the connection drops: resume it with `GET /chat/{X-Run-ID}`."
     ),
     responses={
         200: {
             "content": {"text/event-stream": {}},
             "description": "SSE stream of agent events.",
         },
+        409: {"description": "`resume` is set but the session is unknown; resend the full history."},
+        429: {"description": "Too many runs waiting; retry after `Retry-After` seconds."},
     },
 )
-async def chat(request: ChatRequest):
-    """Stream agent responses as Server-Sent Events."""
+async def chat(request: ChatRequest, http_request: Request):
+    """Start an agent run and stream its events as Server-Sent Events."""
+    if request.resume and not await _has_session(request.conversation_id):
+        raise HTTPException(
+            status.HTTP_409_CONFLICT, f"Session '{request.conversation_id}' not found: resend the full history",
+        )
+    try:
+        ticket = get_admission().reserve(_client_id(http_request))
+    except QueueFull as exc:
+        raise HTTPException(
+            status.HTTP_429_TOO_MANY_REQUESTS, str(exc), headers={"Retry-After": str(exc.retry_after)},
+        ) from None
+    return _event_stream(get_run_registry().start(request, ticket))
+
+
+@router.get(
+    "/chat/{run_id}",
+    summary="Resume a chat stream",
+    description=(
+        "Replay the events of a run after `Last-Event-ID` (all of them without the header), "
+        "then follow it live. 410 if those events are no longer retained."
+    ),
+    responses={200: {"content": {"text/event-stream": {}}, "description": "SSE stream of agent events."}},
+)
+async def resume_chat(run_id: str, last_event_id: int = Header(-1, alias="Last-Event-ID")):
+    """Reattach to a running (or recently finished) agent run."""
+    run = _get_run(run_id)
+    try:
+        run.check_available(last_event_id)
+    except EventsExpired as exc:
+        raise HTTPException(status.HTTP_410_GONE, str(exc)) from None
+    return _event_stream(run, last_event_id)
+
+
+@router.delete("/chat/{run_id}", summary="Cancel a chat run", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_chat(run_id: str) -> None:
+    """Stop the agent run (and any query it is running)."""
+    _get_run(run_id).cancel()
+
+
+@router.delete(
+    "/sessions/{conversation_id}",
+    summary="Forget a conversation's server-side history",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def delete_session(conversation_id: str) -> None:
+    """Drop the stored message history of *conversation_id* (no-op if unknown)."""
+    await asyncio.to_thread(get_session_store().delete, conversation_id)
+
+
+@router.post("/summarize", summary="Summarize a message into a short title", response_model=SummarizeResponse)
+async def summarize(request: SummarizeRequest) -> SummarizeResponse:
+    """A ≤5-word title for a conversation (cached, batched, or extracted when busy)."""
+    return SummarizeResponse(title=await get_title_service().title(request.message))
+
+
+#  Helpers 
+
+
+def _client_id(request: Request) -> str:
+    """The client (tenant) the admission limits apply to."""
+    if client := request.headers.get(settings.chat_client_header):
+        return client
+    return request.client.host if request.client else "unknown"
+
+
+async def _has_session(conversation_id: str | None) -> bool:
+    if conversation_id is None:
+        return False
+    return await asyncio.to_thread(get_session_store().load, conversation_id) is not None
+
+
+def _get_run(run_id: str) -> AgentRun:
+    if (run := get_run_registry().get(run_id)) is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"Run '{run_id}' not found")
+    return run
+
+
+def _event_stream(run: AgentRun, last_event_id: int = -1) -> StreamingResponse:
     return StreamingResponse(
-        stream_chat(request),
+        run.subscribe(last_event_id),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
             "X-Accel-Buffering": "no",
+            "X-Run-ID": run.id,
         },
     )
-
-
-@router.post("/summarize", summary="Summarize a message into a short title", response_model=SummarizeResponse)
-async def summarize(request: SummarizeRequest) -> SummarizeResponse:
-    """Ask the LLM for a ≤5-word title for a conversation."""
-    result = await _summarizer.run(request.message)
-    title = result.output.strip().strip('"').strip("'")
-    return SummarizeResponse(title=title)
@@ -1,24 +1,97 @@
+import gzip
+import hashlib
+from functools import lru_cache
 from pathlib import Path
 
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import FileResponse
+import plotly.offline
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import FileResponse, Response
+
+from api.models import ArtifactUsage
+from config.config import settings
+from services import artifacts
+from services.artifact_store import ArtifactStore, get_artifact_store
 
 router = APIRouter(prefix="/output", tags=["Output files"])
 
-OUTPUT_DIR = Path.cwd() / "output"
+OUTPUT_DIR = Path.cwd() / settings.artifact_dir
 
 # Extension -> Content-Type for files the agent can produce
 MEDIA_TYPES = {
-    ".html": "text/html",
+    ".html": "text/html; charset=utf-8",
+    ".json": "application/json",
+    ".csv": "text/csv; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
 }
 
+# Artifacts are content-addressed: a given URL never changes
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+PLOTLY_JS = f"plotly-{plotly.offline.get_plotlyjs_version()}.min.js"
+
+_PLOT_PAGE = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><script src="{plotly_src}"></script></head>
+<body>
+<div id="plot" class="plotly-graph-div" style="height:100%;width:100%"></div>
+<script>
+var spec = {spec};
+Plotly.newPlot("plot", spec.data, spec.layout || {{}}, {{responsive: true}});
+</script>
+</body>
+</html>
+"""
+
+
+@router.get("", summary="Artifact storage usage", response_model=ArtifactUsage)
+def artifact_usage() -> ArtifactUsage:
+    """Return the number and size of stored artifacts against the quota, and eviction counters."""
+    return ArtifactUsage(backend=settings.artifact_backend, **get_artifact_store().usage())
+
+
+@router.get(
+    f"/assets/{PLOTLY_JS}",
+    summary="Shared plotly.js bundle",
+)
+def get_plotly_js(request: Request) -> Response:
+    """Serve plotly.js once for every chart page (versioned URL, cached forever).
+
+    Sync so that compressing the bundle on first use runs in the threadpool.
+    """
+    return _encoded_response(request, _plotly_js(), MEDIA_TYPES[".js"], etag=PLOTLY_JS)
+
 
 @router.get(
     "/{filename}",
     summary="Download a generated file",
 )
-async def get_output_file(filename: str):
-    """Serve a plot or table previously created by the agent."""
+def get_output_file(filename: str, request: Request):
+    """Serve a plot or table previously created by the agent.
+
+    ``<hash>.json`` is the stored Plotly spec and ``<hash>.html`` a small
+    page rendering it with the shared plotly.js bundle. Sync so that
+    storage reads (possibly remote) run in the threadpool.
+    """
+    name = Path(filename)
+    store = get_artifact_store()
+
+    if name.suffix == ".html" and store.exists(name.stem + ".json"):
+        spec = artifacts.decode(_read_or_404(store, name.stem + ".json", "gzip")).decode()
+        # Absolute URL: the frontend renders the page in an iframe's srcdoc, where a relative one
+        # would resolve against its own origin. The page then depends on the Host, and so does its ETag.
+        plotly_src = str(request.url_for("get_plotly_js"))
+        # Keep "</script>" inside string values from closing the tag
+        page = _PLOT_PAGE.format(plotly_src=plotly_src, spec=spec.replace("</", "<\\/"))
+        body = {"gzip": gzip.compress(page.encode(), mtime=0)}
+        etag = f"{filename}-{hashlib.sha256(plotly_src.encode()).hexdigest()[:8]}"
+        return _encoded_response(request, body, MEDIA_TYPES[".html"], etag=etag)
+
+    if store.exists(filename):
+        body = {enc: _read_or_404(store, filename, enc) for enc in artifacts.ENCODINGS}
+        media_type = MEDIA_TYPES.get(name.suffix, "application/octet-stream")
+        return _encoded_response(request, body, media_type, etag=filename)
+
+    # Files written before artifacts were content-addressed
     filepath = (OUTPUT_DIR / filename).resolve()
 
     # Block path traversal (e.g. "../../etc/passwd")
@@ -30,3 +103,48 @@ async def get_output_file(filename: str):
 
     media_type = MEDIA_TYPES.get(filepath.suffix.lower(), "application/octet-stream")
     return FileResponse(filepath, media_type=media_type)
+
+
+def _read_or_404(store: ArtifactStore, name: str, encoding: str) -> bytes:
+    """Read an artifact, which may have been evicted since `exists` was checked."""
+    try:
+        return store.read_encoded(name, encoding)
+    except FileNotFoundError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, f"'{name}' not found") from None
+
+
+def _encoded_response(request: Request, body: dict[str, bytes], media_type: str, etag: str) -> Response:
+    """Immutable response in the best encoding the client accepts.
+
+    *body* maps Content-Encoding -> pre-compressed bytes and always has
+    "gzip". Each encoding has its own strong ETag (``"<etag>-<encoding>"``,
+    ``"<etag>"`` uncompressed), since its bytes differ.
+    """
+    accepted = {
+        token.split(";")[0].strip()
+        for token in request.headers.get("accept-encoding", "").split(",")
+    }
+    encoding = next((enc for enc in body if enc in accepted), None)
+    tag = f'"{etag}-{encoding}"' if encoding else f'"{etag}"'
+    headers = {"ETag": tag, "Cache-Control": IMMUTABLE, "Vary": "Accept-Encoding"}
+
+    if _etag_matches(request.headers.get("if-none-match", ""), tag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if encoding is None:
+        return Response(gzip.decompress(body["gzip"]), media_type=media_type, headers=headers)
+    return Response(body[encoding], media_type=media_type, headers={**headers, "Content-Encoding": encoding})
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match list matches *etag* (weak comparison, as RFC 9110 requires)."""
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+@lru_cache(maxsize=1)
+def _plotly_js() -> dict[str, bytes]:
+    source = plotly.offline.get_plotlyjs().encode()
+    body = {"gzip": gzip.compress(source, compresslevel=9, mtime=0)}
+    if artifacts.brotli is not None:
+        body = {"br": artifacts.brotli.compress(source), **body}
+    return body
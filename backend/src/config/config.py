@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -8,14 +10,104 @@ class Settings(BaseSettings):
 
     # Base app
     log_level: str = "INFO"
+    chat_trace_log: bool = False  # Log per-request stage timings of /chat as JSON lines
 
     # Data
     data_path: str
+    data_cache: bool = False  # Convert CSVs to a Parquet cache once and load lazily
+    data_cache_dir: str = ".cache/data"
+    # Multi-worker mode (set by gunicorn.conf.py): attach the Parquet cache written once by
+    # `python -m data.materialize`, never convert CSVs in this process
+    data_shared: bool = False
+    data_watch_interval: float = 2.0  # Seconds between data directory polls (0 disables hot-reload)
+    query_cache_bytes: int = 256 * 1024 * 1024  # Result cache budget for query_data (0 disables)
+    # Results over either budget are spilled to a temporary Parquet file
+    query_max_rows: int = 100_000
+    query_max_bytes: int = 64 * 1024 * 1024
+    query_spill_dir: str = ".cache/spill"
+    # Query execution limits (DuckDB applies memory_limit/threads database-wide)
+    query_timeout: float = 30.0  # Seconds before a query is interrupted
+    query_memory_limit: str = "2GB"
+    query_threads: int = 0  # 0 keeps DuckDB's default (one per core)
+    query_sample_rows: int = 1_000_000  # Reservoir sample per table for sampled query_data (smaller tables run exactly)
+    # Dataset profiles (SUMMARIZE + top values), computed once per dataset version
+    profile_dir: str = ".cache/profiles"
+    profile_top_k: int = 5  # Most frequent values kept per categorical column
+    profile_in_prompt: bool = True  # Describe column types, ranges and values in the system prompt
+    # Past this many datasets, the prompt only describes the most relevant ones (BM25 on names,
+    # columns and values); the agent finds the others with list_tables/describe_table. 0 = all
+    schema_prompt_tables: int = 8
+
+    # Visualization: "process" runs plotting code in a worker pool, "inline" in the event loop
+    visualize_mode: Literal["process", "inline"] = "process"
+    visualize_workers: int = 0  # 0 = one per core
+    visualize_timeout: float = 30.0
+    visualize_memory_limit_mb: int = 2048  # Heap cap per worker (0 disables)
+    # Scatter/line traces over this many points in all are thinned after plotting (LTTB, grid); 0 disables
+    visualize_max_points: int = 5000
+
+    # SSE output: adjacent content/thinking deltas are merged within a time/size window
+    sse_coalesce_ms: float = 20.0  # 0 sends every delta as its own frame
+    sse_coalesce_bytes: int = 1024
+    sse_queue_size: int = 64  # Events buffered ahead of a full run log before the agent is paused
+
+    # Chat runs outlive their connection; clients resume with Last-Event-ID
+    run_log_bytes: int = 8 * 1024 * 1024  # SSE frames kept per run for replay; a client this far behind pauses the run
+    run_retention_seconds: float = 300.0  # Finished runs stay resumable this long
+    run_orphan_timeout: float = 30.0  # Runs without any client are cancelled after this
+
+    # Admission control: runs over the active limits wait in a queue served round-robin across
+    # clients; past the queue limits /chat answers 429 with Retry-After
+    chat_max_active: int = 8  # Concurrent agent runs in this process (0 = unlimited)
+    chat_max_active_per_client: int = 2  # 0 = unlimited
+    chat_max_queued: int = 32  # 0 = no queue, shed as soon as the limits are reached
+    chat_max_queued_per_client: int = 8  # 0 = only the global queue limit applies
+    chat_client_header: str = "X-Client-ID"  # Identifies the client (tenant); its IP address otherwise
+
+    # Conversation sessions (server-side history keyed by conversation_id)
+    session_backend: Literal["memory", "sqlite"] = "memory"
+    session_sqlite_path: str = ".cache/sessions.sqlite"
+    session_max_sessions: int = 1000  # Memory backend: least recently used sessions are dropped
+    session_max_tokens: int = 8000  # Older turns are compacted past this (estimated) size
+    session_keep_turns: int = 2  # Most recent turns always kept verbatim
+
+    # Answer cache: replay recorded answers to questions opening a conversation, per dataset generation
+    answer_cache: bool = False
+    answer_cache_entries: int = 256
+    answer_cache_similarity: float = 1.0  # Below 1, close rewordings (word-vector cosine) match too
+
+    # Artifact storage (plots/tables served under /api/v1/output)
+    artifact_backend: Literal["local", "s3"] = "local"
+    artifact_dir: str = "output"  # Local backend root
+    artifact_max_bytes: int = 1024 * 1024 * 1024  # Least recently used artifacts are evicted above this
+    artifact_ttl_seconds: float = 7 * 24 * 3600  # 0 keeps artifacts until the quota evicts them
+    artifact_evict_interval: float = 60.0
+    # S3 backend (credentials from the standard AWS_* variables); set endpoint_url for MinIO & co.
+    artifact_s3_bucket: str = ""
+    artifact_s3_prefix: str = "artifacts/"
+    artifact_s3_endpoint_url: str | None = None
 
     # LLM configuration
     llm_base_url: str
     llm_model: str
     llm_api_key: str
+    # One keep-alive connection pool for all LLM traffic (each streaming request holds a connection)
+    llm_pool_size: int = 100
+    llm_keepalive_seconds: float = 60.0  # Idle connections are kept open this long
+    llm_http2: bool = True  # Negotiated over TLS only: plain-HTTP backends (e.g. Ollama) stay on HTTP/1.1
+    # More OpenAI-compatible backends serving llm_model, as a JSON list; each request goes to the
+    # healthy backend (llm_base_url included) with the fewest requests in flight
+    llm_base_urls: list[str] = []
+    llm_health_interval: float = 10.0  # Seconds between backend health checks (0 disables)
+    # /summarize (conversation titles): cached, micro-batched, on a smaller model when set
+    summarize_model: str = ""  # e.g. "openai:qwen2.5:0.5b", served by the same backends; empty = llm_model
+    summarize_cache_size: int = 1024  # Titles kept, by normalized message
+    summarize_batch_ms: float = 50.0  # Requests arriving within this window share one LLM call
+    summarize_max_batch: int = 16
+    summarize_max_pending: int = 64  # Past this many waiting titles (or with chat runs queued), extract locally
+    llm_prompt_cache: bool = True  # Ask the provider to cache the constant prompt prefix (Anthropic, OpenAI)
+    # (open, close) pairs marking inline reasoning in the content stream, as JSON in the env
+    thinking_tags: list[tuple[str, str]] = [("<thinking>", "</thinking>"), ("<think>", "</think>")]
 
 
 settings = Settings()
\ No newline at end of file
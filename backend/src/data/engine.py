@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import threading
+from collections.abc import Callable, Iterator, Mapping
+from contextlib import contextmanager, suppress
+from functools import cache
+from pathlib import Path
+from typing import TypeVar
+
+import duckdb
+import pandas as pd
+
+from config.config import settings
+from data.loader import get_datasets, get_parquet_paths, on_datasets_change
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Schema holding the reservoir samples of large tables, for sampled queries
+SAMPLE_SCHEMA = "sample"
+
+
+class DuckDBEngine:
+    """Process-wide DuckDB database holding every dataset as a native table.
+
+    Datasets are copied into DuckDB once, so queries no longer pay for
+    connection setup and a Pandas scan on every call (the loader drops
+    its DataFrames once handed over, so they live in memory only here).
+    Datasets backed by a Parquet cache file are exposed as views over that
+    file instead, so nothing is read until a query touches them. Each
+    query runs on its own cursor (a lightweight connection to the same
+    database), which keeps concurrent requests from sharing statement
+    state.
+
+    Usage:
+
+        with get_engine().cursor() as cur:
+            df = cur.execute("SELECT * FROM sales").fetchdf()
+
+        # From async code: off the event loop, interrupted on timeout/cancel
+        df = await get_engine().run(lambda cur: cur.execute(sql).fetchdf(), timeout=30)
+    """
+
+    def __init__(
+        self,
+        datasets: Mapping[str, pd.DataFrame] | None = None,
+        parquet_paths: dict[str, Path] | None = None,
+        config: dict[str, str | int] | None = None,
+    ) -> None:
+        self._conn = duckdb.connect(database=":memory:", config=config or {})
+        # The root connection is not thread-safe: guard DDL and cursor creation.
+        self._lock = threading.Lock()
+        self.tables: set[str] = set()
+        self._views: set[str] = set()
+        # name -> (sample rows, total rows), or None for tables small enough to scan in full
+        self._samples: dict[str, tuple[int, int] | None] = {}
+        self._sample_lock = threading.Lock()
+        self._conn.execute(f"CREATE SCHEMA {SAMPLE_SCHEMA}")
+
+        parquet_paths = parquet_paths or {}
+        for name, path in parquet_paths.items():
+            self.attach_parquet(name, path)
+        for name in datasets or {}:
+            if name not in parquet_paths:
+                self.load_table(name, datasets[name])
+
+    def load_table(self, name: str, df: pd.DataFrame) -> None:
+        """Create (or replace) table *name* from a DataFrame."""
+        with self._lock:
+            self._conn.register("_ingest", df)
+            try:
+                self._conn.execute(f'CREATE OR REPLACE TABLE "{name}" AS SELECT * FROM _ingest')
+            finally:
+                self._conn.unregister("_ingest")
+            self.tables.add(name)
+        self._drop_sample(name)
+        log.info("Engine – loaded table %s (%d rows)", name, len(df))
+
+    def attach_parquet(self, name: str, path: Path) -> None:
+        """Create (or replace) view *name* reading a Parquet file on demand."""
+        source = "'" + str(path.resolve()).replace("'", "''") + "'"
+        with self._lock:
+            self._conn.execute(f'CREATE OR REPLACE VIEW "{name}" AS SELECT * FROM read_parquet({source})')
+            self.tables.add(name)
+            self._views.add(name)
+        self._drop_sample(name)
+        log.info("Engine – attached %s -> %s", name, path)
+
+    def drop(self, name: str) -> None:
+        """Remove table or view *name* if it exists."""
+        with self._lock:
+            kind = "VIEW" if name in self._views else "TABLE"
+            self._conn.execute(f'DROP {kind} IF EXISTS "{name}"')
+            self.tables.discard(name)
+            self._views.discard(name)
+        self._drop_sample(name)
+        log.info("Engine – dropped %s", name)
+
+    def sample(self, cur: duckdb.DuckDBPyConnection, name: str, rows: int) -> tuple[int, int] | None:
+        """Reservoir sample of table *name* as ``sample."name"``, built with *cur* on first use.
+
+        Returns ``(sample_rows, total_rows)``, or None when the table has at
+        most *rows* rows and is simply queried in full. The sample is seeded,
+        so a dataset version always gets the same one; it is dropped when
+        the dataset is reloaded.
+        """
+        if name in self._samples:
+            return self._samples[name]
+        with self._sample_lock:
+            if name not in self._samples:
+                total = cur.execute(f'SELECT COUNT(*) FROM main."{name}"').fetchone()[0]
+                if total <= rows:
+                    self._samples[name] = None
+                else:
+                    cur.execute(
+                        f'CREATE OR REPLACE TABLE {SAMPLE_SCHEMA}."{name}" AS '
+                        f'SELECT * FROM main."{name}" USING SAMPLE reservoir({rows} ROWS) REPEATABLE (0)'
+                    )
+                    self._samples[name] = (rows, total)
+                    log.info("Engine – sampled %s: %d of %d rows", name, rows, total)
+            return self._samples[name]
+
+    def _drop_sample(self, name: str) -> None:
+        # Waits for a sample being built from the old data, then discards it
+        with self._sample_lock:
+            if self._samples.pop(name, None) is not None:
+                with self._lock:
+                    self._conn.execute(f'DROP TABLE IF EXISTS {SAMPLE_SCHEMA}."{name}"')
+
+    def refresh(self, changed: set[str], removed: set[str]) -> None:
+        """Loader listener: reload changed datasets and drop removed ones."""
+        parquet_paths = get_parquet_paths()
+        for name in removed:
+            self.drop(name)
+        for name in changed:
+            if name in parquet_paths:
+                self.attach_parquet(name, parquet_paths[name])
+            else:
+                self.load_table(name, get_datasets()[name])
+
+    @contextmanager
+    def cursor(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        """Yield a dedicated cursor on the shared database, closed on exit."""
+        with self._lock:
+            cur = self._conn.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+    async def run(self, fn: Callable[[duckdb.DuckDBPyConnection], T], timeout: float) -> T:
+        """Run ``fn(cursor)`` in a worker thread, keeping the event loop free.
+
+        On timeout (``TimeoutError``) or cancellation of the awaiting task
+        (e.g. the SSE client went away) the query is interrupted. The worker
+        thread owns the cursor and closes it, so nothing waits for it here.
+        """
+        with self._lock:
+            cur = self._conn.cursor()
+
+        def work() -> T:
+            try:
+                return fn(cur)
+            finally:
+                cur.close()
+
+        task = asyncio.ensure_future(asyncio.to_thread(work))
+        # The outcome of an abandoned worker is expected to be an interrupt error: swallow it.
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            with suppress(duckdb.Error):
+                cur.interrupt()
+            raise
+
+
+def _engine_config() -> dict[str, str | int]:
+    """DuckDB resource limits. They apply to the whole database, not per cursor."""
+    config: dict[str, str | int] = {"memory_limit": settings.query_memory_limit}
+    if settings.query_threads > 0:
+        config["threads"] = settings.query_threads
+    return config
+
+
+@cache
+def get_engine() -> DuckDBEngine:
+    """The process' engine, built on first use (after the loader), then kept in sync with it."""
+    engine = DuckDBEngine(get_datasets(), get_parquet_paths(), config=_engine_config())
+    on_datasets_change(engine.refresh)
+    return engine
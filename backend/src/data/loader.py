@@ -1,23 +1,78 @@
 import re
+import json
+import hashlib
 import logging
+import threading
+from functools import cache
+from collections.abc import Callable, Iterator, Mapping
 from pathlib import Path
 
 import pandas as pd
 
+from config.config import settings
+
 log = logging.getLogger(__name__)
 
 
+class LazyDatasets(Mapping[str, pd.DataFrame]):
+    """name->DataFrame mapping over the dataset files, holding no data itself.
+
+    Iterating or checking membership never touches the data;
+    ``mapping[name]`` reads the file (Parquet cache or CSV). The frames
+    passed in, just read by a reload, are handed out once then dropped:
+    the engine copies every dataset into DuckDB, and keeping them here
+    would hold each dataset in memory twice.
+    """
+
+    def __init__(self, paths: dict[str, Path], frames: dict[str, pd.DataFrame] | None = None) -> None:
+        self._paths = paths
+        self._pending = dict(frames or {})
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        with self._lock:
+            df = self._pending.pop(name, None)
+        if df is not None:
+            return df
+        path = self._paths[name]
+        log.info("Reading dataset %s", name)
+        return pd.read_parquet(path) if path.suffix == ".parquet" else pd.read_csv(path)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+
 class DataLoader:
-    """Singleton that reads every CSV in a directory at import time.
+    """Singleton that reads every CSV in a directory when first built.
+
+    After construction, `.datasets` maps names to DataFrames (read from
+    the files on access, see `LazyDatasets`) and `.info` holds lightweight
+    metadata dicts for the API.
+
+    With ``settings.data_cache`` enabled, each CSV is converted once to a
+    Parquet file under ``settings.data_cache_dir`` (keyed by source
+    mtime/size, then content hash). Later startups only read the JSON
+    metadata next to it; `.parquet_paths` lets the engine query the files
+    directly. With ``settings.data_shared`` the cache is written by
+    another process (see `materialize`): this one only attaches files
+    that are up to date.
 
-    After construction, `.datasets` holds name->DataFrame mappings and
-    `.info` holds lightweight metadata dicts for the API.
+    `.reload()` re-ingests only added/changed files and drops removed
+    ones. The registries are rebuilt aside and swapped in by attribute
+    assignment, so readers always see a consistent snapshot. Every
+    effective reload bumps `.generation`; each dataset records the
+    generation it was last (re)loaded at as its version.
     """
 
     _instance: "DataLoader | None" = None
 
-    datasets: dict[str, pd.DataFrame]
+    datasets: Mapping[str, pd.DataFrame]
+    parquet_paths: dict[str, Path]
     info: list[dict]
+    generation: int
 
     def __new__(cls, data_path: str | None = None):
         if cls._instance is not None:
@@ -27,9 +82,15 @@ class DataLoader:
             raise ValueError("data_path required on first instantiation")
 
         inst = super().__new__(cls)
-        inst.datasets = {}
+        inst.datasets = LazyDatasets({})
+        inst.parquet_paths = {}
         inst.info = []
-        inst._load(Path(data_path))
+        inst.generation = 0
+        inst._data_dir = Path(data_path)
+        inst._fingerprints: dict[str, tuple[int, int]] = {}
+        inst._listeners: list[Callable[[set[str], set[str]], None]] = []
+        inst._lock = threading.Lock()
+        inst._load()
         cls._instance = inst
         return inst
 
@@ -37,44 +98,234 @@ class DataLoader:
     def __init__(self, data_path: str | None = None):
         pass
 
-    def _load(self, data_dir: Path) -> None:
-        if not data_dir.exists():
-            raise FileNotFoundError(f"Data directory '{data_dir}' not found")
+    def _load(self) -> None:
+        if not self._data_dir.exists():
+            raise FileNotFoundError(f"Data directory '{self._data_dir}' not found")
+
+        if not any(self._data_dir.glob("*.csv")):
+            raise FileNotFoundError(f"No CSV files in '{self._data_dir}'")
+
+        self.reload()
+
+    def subscribe(self, listener: Callable[[set[str], set[str]], None]) -> None:
+        """Call ``listener(changed, removed)`` after every effective reload."""
+        self._listeners.append(listener)
 
-        csv_files = sorted(data_dir.glob("*.csv"))
-        if not csv_files:
-            raise FileNotFoundError(f"No CSV files in '{data_dir}'")
+    def reload(self) -> tuple[set[str], set[str]]:
+        """Sync the registry with the data directory; return ``(changed, removed)`` names."""
+        with self._lock:
+            found = {_dataset_name(path): path for path in sorted(self._data_dir.glob("*.csv"))}
+            fingerprints = {name: _fingerprint(path) for name, path in found.items()}
+            changed = {name for name, fp in fingerprints.items() if self._fingerprints.get(name) != fp}
+            removed = set(self._fingerprints) - set(found)
+            if not changed and not removed:
+                return changed, removed
 
-        log.info("Loading %d CSV files from %s", len(csv_files), data_dir)
+            log.info("Loading %d CSV files from %s", len(changed), self._data_dir)
 
-        for path in csv_files:
-            name = re.sub(r"[^a-zA-Z0-9_]", "_", path.stem).strip("_").lower()
-            df = pd.read_csv(path)
-            self.datasets[name] = df
-            self.info.append({
-                "name": name,
-                "rows": df.shape[0],
-                "columns": df.shape[1],
-                "column_names": df.columns.tolist(),
-            })
+            generation = self.generation + 1
+            info_by_name = {ds["name"]: ds for ds in self.info}
+            parquet_paths = {name: p for name, p in self.parquet_paths.items() if name not in removed}
+            frames: dict[str, pd.DataFrame] = {}  # Read by this reload, for the engine to ingest
+            cached = _uses_cache()
+            if cached:
+                cache_dir = Path(settings.data_cache_dir)
+                cache_dir.mkdir(parents=True, exist_ok=True)
 
+            for name in sorted(changed):
+                try:
+                    if cached:
+                        parquet_paths[name], meta = _load_cached(
+                            found[name], cache_dir / name, convert=not settings.data_shared,
+                        )
+                        ds = {key: meta[key] for key in ("name", "rows", "columns", "column_names")}
+                    else:
+                        frames[name] = pd.read_csv(found[name])
+                        ds = _describe(name, frames[name])
+                except Exception as exc:
+                    # Likely a file still being written: keep the old version, retry next reload.
+                    log.warning("Could not load %s: %s", found[name], exc)
+                    fingerprints.pop(name)
+                    continue
+                info_by_name[name] = {**ds, "version": generation}
 
-# Loaded once at import time
-_loader = DataLoader(data_path="./data")
+            changed &= fingerprints.keys()
+            for name in removed:
+                info_by_name.pop(name, None)
+                if settings.data_cache and not settings.data_shared:
+                    _remove_cached(Path(settings.data_cache_dir) / name)
 
+            # Swap in the new snapshot
+            sources = parquet_paths if cached else {name: found[name] for name in found if name in info_by_name}
+            self.datasets = LazyDatasets(sources, frames)
+            self.parquet_paths = parquet_paths
+            self.info = [info_by_name[name] for name in found if name in info_by_name]
+            # Names that failed to load keep their old fingerprint, so they are retried.
+            self._fingerprints = {
+                name: fp for name, fp in self._fingerprints.items() if name not in removed
+            } | fingerprints
+            if changed or removed:
+                self.generation = generation
 
-def get_datasets() -> dict[str, pd.DataFrame]:
-    return _loader.datasets
+        if changed or removed:
+            log.info("Datasets generation %d – changed: %s | removed: %s",
+                     self.generation, sorted(changed), sorted(removed))
+            for listener in self._listeners:
+                listener(changed, removed)
+        return changed, removed
+
+
+def _uses_cache() -> bool:
+    return settings.data_cache or settings.data_shared
+
+
+def _remove_cached(stem: Path) -> None:
+    for suffix in (".parquet", ".json"):
+        stem.with_suffix(suffix).unlink(missing_ok=True)
+
+
+def _dataset_name(path: Path) -> str:
+    """Sanitised file stem, used as the SQL table name."""
+    return re.sub(r"[^a-zA-Z0-9_]", "_", path.stem).strip("_").lower()
+
+
+def _fingerprint(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _describe(name: str, df: pd.DataFrame) -> dict:
+    return {
+        "name": name,
+        "rows": df.shape[0],
+        "columns": df.shape[1],
+        "column_names": df.columns.tolist(),
+    }
+
+
+def _file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_cached(source: Path, stem: Path, convert: bool = True) -> tuple[Path, dict]:
+    """Return ``(parquet_path, metadata)`` for *source*, converting only if stale.
+
+    A matching mtime and size is trusted as-is. Otherwise the content hash
+    decides: a touched-but-identical file just refreshes the metadata.
+    Without *convert*, a stale cache raises instead (it is someone else's
+    job to refresh it, and the caller retries later).
+    """
+    parquet_path = stem.with_suffix(".parquet")
+    meta_path = stem.with_suffix(".json")
+    stat = source.stat()
+
+    meta: dict = {}
+    if meta_path.is_file() and parquet_path.is_file():
+        meta = json.loads(meta_path.read_text())
+        if meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+            return parquet_path, meta
+    if not convert:
+        raise FileNotFoundError(f"{source.name} is not materialized yet")
+
+    sha256 = _file_hash(source)
+    if meta.get("sha256") != sha256:
+        log.info("Caching %s -> %s", source.name, parquet_path)
+        df = pd.read_csv(source)
+        # Write aside then rename, so queries reading the old file never see a partial one
+        tmp_path = parquet_path.with_suffix(".parquet.tmp")
+        df.to_parquet(tmp_path, index=False)
+        tmp_path.replace(parquet_path)
+        meta = {
+            **_describe(stem.name, df),
+            "dtypes": {col: str(dtype) for col, dtype in df.dtypes.items()},
+            "sha256": sha256,
+        }
+
+    # The metadata goes last, and atomically: readers trusting it always find the matching file
+    meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    tmp_path = meta_path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(meta))
+    tmp_path.replace(meta_path)
+    return parquet_path, meta
+
+
+def materialize(data_dir: Path, cache_dir: Path) -> tuple[set[str], set[str]]:
+    """Bring the Parquet cache of every CSV in *data_dir* up to date; return ``(changed, removed)``.
+
+    The writer side of ``settings.data_shared``: run in a single process
+    (see ``gunicorn.conf.py``) while the workers only read the cache.
+    Files are replaced atomically, so workers never see a partial one.
+    """
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    found = {_dataset_name(path): path for path in sorted(data_dir.glob("*.csv"))}
+    changed = set()
+    for name, source in found.items():
+        meta_path = (cache_dir / name).with_suffix(".json")
+        before = meta_path.stat().st_mtime_ns if meta_path.is_file() else None
+        try:
+            _load_cached(source, cache_dir / name)
+        except Exception as exc:
+            log.warning("Could not materialize %s: %s", source, exc)
+            continue
+        if meta_path.stat().st_mtime_ns != before:
+            changed.add(name)
+    removed = {path.stem for path in cache_dir.glob("*.json")} - found.keys()
+    for name in removed:
+        _remove_cached(cache_dir / name)
+    return changed, removed
+
+
+@cache
+def _get_loader() -> DataLoader:
+    """The process' loader, built on first use: in each worker, after fork."""
+    return DataLoader(data_path="./data")
+
+
+def get_datasets() -> Mapping[str, pd.DataFrame]:
+    return _get_loader().datasets
+
+
+def get_generation() -> int:
+    """Incremented every time a reload adds, changes or removes a dataset."""
+    return _get_loader().generation
+
+
+def get_versions() -> dict[str, int]:
+    """Generation at which each dataset was last (re)loaded."""
+    return {ds["name"]: ds["version"] for ds in _get_loader().info}
+
+
+def get_fingerprint(name: str) -> tuple[int, int] | None:
+    """Source CSV ``(mtime_ns, size)`` of dataset *name*; unlike its version, stable across restarts."""
+    return _get_loader()._fingerprints.get(name)
+
+
+def reload_datasets() -> tuple[set[str], set[str]]:
+    return _get_loader().reload()
+
+
+def on_datasets_change(listener: Callable[[set[str], set[str]], None]) -> None:
+    _get_loader().subscribe(listener)
+
+
+def get_parquet_paths() -> dict[str, Path]:
+    """Parquet cache file per dataset (empty unless ``settings.data_cache``/``data_shared``)."""
+    return _get_loader().parquet_paths
 
 
 def get_info() -> list[dict]:
-    return _loader.info
+    return _get_loader().info
 
 
 def get_dataset_info_str() -> str:
     """Markdown-formatted summary of every dataset (used in the system prompt)."""
-    lines = []
-    for ds in _loader.info:
-        cols = ", ".join(ds["column_names"])
-        lines.append(f"- **{ds['name']}**: {ds['rows']} rows, {ds['columns']} columns. Columns: {cols}")
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(format_dataset_info(ds) for ds in _get_loader().info)
+
+
+def format_dataset_info(ds: dict) -> str:
+    cols = ", ".join(ds["column_names"])
+    return f"- **{ds['name']}**: {ds['rows']} rows, {ds['columns']} columns. Columns: {cols}"
@@ -0,0 +1,43 @@
+"""Writer side of the shared dataset cache (``settings.data_shared``).
+
+Converts every CSV of the data directory to the Parquet cache, then, with
+``--watch``, keeps it in sync every ``settings.data_watch_interval``
+seconds. Run from the backend directory, by a single process:
+
+    PYTHONPATH=src python -m data.materialize [--watch]
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+from config.config import settings
+from data.loader import materialize
+
+log = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--watch", action="store_true", help="keep the cache in sync until killed")
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=settings.log_level.upper(),
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+        stream=sys.stdout,
+    )
+
+    data_dir, cache_dir = Path("./data"), Path(settings.data_cache_dir)
+    while True:
+        changed, removed = materialize(data_dir, cache_dir)
+        if changed or removed:
+            log.info("Materialized – changed: %s | removed: %s", sorted(changed), sorted(removed))
+        if not args.watch or settings.data_watch_interval <= 0:
+            return
+        time.sleep(settings.data_watch_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import json
+import logging
+import os
+import threading
+from functools import cache
+from pathlib import Path
+
+from config.config import settings
+from data.engine import get_engine
+from data.loader import format_dataset_info, get_fingerprint, get_info, on_datasets_change
+
+log = logging.getLogger(__name__)
+
+_NUMERIC = {
+    "TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT",
+    "UTINYINT", "USMALLINT", "UINTEGER", "UBIGINT", "UHUGEINT",
+    "FLOAT", "DOUBLE",
+}
+# Columns with more distinct values than this share of their rows are identifier-like:
+# their top values are all ties, not worth a GROUP BY
+_MAX_DISTINCT_RATIO = 0.5
+_PROMPT_VALUE_CHARS = 40
+
+
+def _is_numeric(column_type: str) -> bool:
+    return column_type in _NUMERIC or column_type.startswith("DECIMAL")
+
+
+class ProfileStore:
+    """Per-column statistics of every dataset, computed once per dataset version.
+
+    A profile comes from DuckDB ``SUMMARIZE`` (type, min/max, approximate
+    distinct count, null ratio) plus the *top_k* most frequent values of
+    categorical columns. Profiles are keyed by the source file fingerprint
+    and written to *cache_dir*, so restarts reuse them; a reloaded dataset
+    gets a new fingerprint and its profile is recomputed on next use.
+    """
+
+    def __init__(self, cache_dir: Path, top_k: int) -> None:
+        self.cache_dir = cache_dir
+        self.top_k = top_k
+        self._profiles: dict[str, tuple[tuple[int, int] | None, dict]] = {}  # name -> (fingerprint, profile)
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> dict:
+        """The profile of dataset *name*, from memory, disk or a fresh computation."""
+        if (profile := self.cached(name)) is not None:
+            return profile
+        with self._lock:
+            if (profile := self.cached(name)) is None:
+                fingerprint = get_fingerprint(name)
+                profile = self._load(name, fingerprint) or self._compute(name, fingerprint)
+                self._profiles[name] = fingerprint, profile
+        return profile
+
+    def cached(self, name: str) -> dict | None:
+        """The current profile of *name* if already in memory; never computes."""
+        entry = self._profiles.get(name)
+        if entry is None or entry[0] != get_fingerprint(name):
+            return None
+        return entry[1]
+
+    def warm(self) -> None:
+        """Make sure every loaded dataset has a profile."""
+        for ds in get_info():
+            try:
+                self.get(ds["name"])
+            except Exception as exc:
+                log.warning("Could not profile %s: %s", ds["name"], exc)
+
+    def invalidate(self, changed: set[str], removed: set[str]) -> None:
+        """Loader listener: forget the profiles of changed or removed datasets."""
+        with self._lock:
+            for name in changed | removed:
+                self._profiles.pop(name, None)
+            for name in removed:
+                self._path(name).unlink(missing_ok=True)
+
+    def _path(self, name: str) -> Path:
+        return self.cache_dir / f"{name}.json"
+
+    def _load(self, name: str, fingerprint: tuple[int, int] | None) -> dict | None:
+        path = self._path(name)
+        if fingerprint is None or not path.is_file():
+            return None
+        cached = json.loads(path.read_text())
+        if cached["fingerprint"] != list(fingerprint) or cached["top_k"] != self.top_k:
+            return None
+        return {**cached["profile"], "version": _version(name)}
+
+    def _compute(self, name: str, fingerprint: tuple[int, int] | None) -> dict:
+        version = _version(name)
+        table = '"' + name.replace('"', '""') + '"'
+
+        with get_engine().cursor() as cur:
+            summary = cur.execute(f"SUMMARIZE {table}").fetchall()
+            rows = summary[0][10] if summary else 0
+            columns = []
+            for column, column_type, low, high, distinct, *_, null_percentage in summary:
+                top_values = []
+                categorical = not _is_numeric(column_type) or distinct <= self.top_k
+                if categorical and distinct <= max(rows * _MAX_DISTINCT_RATIO, self.top_k):
+                    quoted = '"' + column.replace('"', '""') + '"'
+                    top_values = [
+                        {"value": value, "count": count}
+                        for value, count in cur.execute(
+                            f"SELECT CAST({quoted} AS VARCHAR), COUNT(*) FROM {table} "
+                            f"WHERE {quoted} IS NOT NULL GROUP BY 1 ORDER BY 2 DESC, 1 LIMIT {self.top_k}"
+                        ).fetchall()
+                    ]
+                columns.append({
+                    "name": column,
+                    "dtype": column_type,
+                    "null_ratio": float(null_percentage or 0) / 100,
+                    "min": low,
+                    "max": high,
+                    "approx_distinct": min(distinct, rows),  # HyperLogLog can overshoot
+                    "top_values": top_values,
+                })
+
+        profile = {"name": name, "rows": rows, "columns": columns}
+        if fingerprint is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            payload = {"fingerprint": list(fingerprint), "top_k": self.top_k, "profile": profile}
+            tmp_path = self._path(name).with_suffix(f".{os.getpid()}.tmp")  # Workers may profile at once
+            tmp_path.write_text(json.dumps(payload))
+            tmp_path.replace(self._path(name))
+        log.info("Profiled %s (%d columns)", name, len(columns))
+        return {**profile, "version": version}
+
+
+def _version(name: str) -> int:
+    return next((ds["version"] for ds in get_info() if ds["name"] == name), 0)
+
+
+#  Prompt
+
+
+def format_profile(profile: dict) -> str:
+    """Compact Markdown description of one dataset, one line per column."""
+    lines = [f"- **{profile['name']}**: {profile['rows']} rows, {len(profile['columns'])} columns"]
+    for col in profile["columns"]:
+        facts = [col["dtype"]]
+        values = [_clip(v["value"]) for v in col["top_values"]]
+        if values and col["approx_distinct"] <= len(values):
+            facts.append("values: " + ", ".join(values))
+        elif values:
+            facts.append(f"~{col['approx_distinct']} distinct, top: " + ", ".join(values))
+        elif col["min"] is not None:
+            facts.append(f"{_clip(col['min'])} .. {_clip(col['max'])}")
+            if not _is_numeric(col["dtype"]):
+                facts.append(f"~{col['approx_distinct']} distinct")
+        if col["null_ratio"] > 0:
+            facts.append(f"{col['null_ratio']:.0%} null" if col["null_ratio"] >= 0.01 else "<1% null")
+        lines.append(f"  - {col['name']} ({'; '.join(facts)})")
+    return "\n".join(lines)
+
+
+def get_dataset_profiles_str(names: list[str] | None = None) -> str:
+    """Like `get_dataset_info_str`, with each dataset's column profile (computed if missing).
+
+    Describes *names* in that order (default: every dataset). Blocking:
+    call it from a worker thread.
+    """
+    info = get_info()
+    if names is not None:
+        by_name = {ds["name"]: ds for ds in info}
+        info = [by_name[name] for name in names if name in by_name]
+    lines = []
+    for ds in info:
+        try:
+            lines.append(format_profile(get_profile_store().get(ds["name"])))
+        except Exception as exc:
+            log.warning("Could not profile %s: %s", ds["name"], exc)
+            lines.append(format_dataset_info(ds))
+    return "\n".join(lines)
+
+
+def _clip(value: str) -> str:
+    return value if len(value) <= _PROMPT_VALUE_CHARS else value[:_PROMPT_VALUE_CHARS - 1] + "…"
+
+
+@cache
+def get_profile_store() -> ProfileStore:
+    """The process' profile store, built on first use, then kept in sync with the loader."""
+    store = ProfileStore(Path(settings.profile_dir), settings.profile_top_k)
+    on_datasets_change(store.invalidate)
+    return store
@@ -0,0 +1,128 @@
+import re
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cache
+
+import pyarrow as pa
+
+from config.config import settings
+from data.loader import get_versions, on_datasets_change
+
+log = logging.getLogger(__name__)
+
+# String literals and quoted identifiers are kept verbatim; comments and
+# whitespace runs collapse to a single space.
+_SQL_TOKENS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|(--[^\n]*|/\*.*?\*/|\s+)""", re.S)
+
+
+def normalize_sql(sql: str) -> str:
+    """Canonical form of *sql*: case-folded keywords/identifiers, single spaces, no comments."""
+    parts: list[str] = []
+    pos = 0
+    for match in _SQL_TOKENS.finditer(sql):
+        if match.start() > pos:
+            parts.append(sql[pos:match.start()].lower())
+        quoted = match.group(1)
+        if quoted:
+            parts.append(quoted)
+        elif parts and parts[-1] != " ":
+            parts.append(" ")
+        pos = match.end()
+    parts.append(sql[pos:].lower())
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def sql_fingerprint(sql: str) -> str:
+    return hashlib.sha256(normalize_sql(sql).encode()).hexdigest()
+
+
+@dataclass
+class _Entry:
+    table: pa.Table
+    tables: frozenset[str]
+
+
+class QueryCache:
+    """In-process LRU of query results as Arrow tables, bounded in bytes.
+
+    Keys combine the normalized SQL fingerprint with the version of every
+    table the query reads, so a reloaded dataset can never serve a stale
+    result; `.invalidate()` also frees those entries straight away.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(sql: str, tables: set[str], mode: str = "exact") -> tuple:
+        """Cache key for *sql* reading *tables* at their current dataset versions, run in *mode*."""
+        versions = get_versions()
+        return (sql_fingerprint(sql), tuple(sorted((t, versions.get(t, 0)) for t in tables)), mode)
+
+    def get(self, key: tuple) -> pa.Table | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.table
+
+    def put(self, key: tuple, table: pa.Table) -> None:
+        # Results larger than the whole budget are not worth evicting everything for
+        if table.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(table, frozenset(t for t, _ in key[1]))
+            self.bytes += table.nbytes
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, changed: set[str], removed: set[str]) -> None:
+        """Loader listener: drop every entry reading a changed or removed table."""
+        stale_tables = changed | removed
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.tables & stale_tables]
+            for key in stale:
+                self._remove(key)
+        if stale:
+            log.info("Query cache – invalidated %d entries", len(stale))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key: tuple) -> None:
+        self.bytes -= self._entries.pop(key).table.nbytes
+
+
+@cache
+def _build_query_cache() -> QueryCache:
+    query_cache = QueryCache(settings.query_cache_bytes)
+    on_datasets_change(query_cache.invalidate)
+    return query_cache
+
+
+def get_query_cache() -> QueryCache | None:
+    """The shared result cache, or None when ``settings.query_cache_bytes`` is 0."""
+    return _build_query_cache() if settings.query_cache_bytes > 0 else None
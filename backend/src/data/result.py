@@ -0,0 +1,104 @@
+import logging
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+log = logging.getLogger(__name__)
+
+PREVIEW_ROWS = 5
+BATCH_ROWS = 10_000
+
+
+@dataclass
+class QueryResult:
+    """Outcome of one query, kept in memory only while under budget.
+
+    Small results hold the Arrow `table`; larger ones were streamed to a
+    Parquet file at `spill_path` and are only read back on demand.
+    """
+
+    schema: pa.Schema
+    rows: int
+    nbytes: int
+    preview: pa.Table
+    table: pa.Table | None = None
+    spill_path: Path | None = None
+
+    @property
+    def columns(self) -> list[str]:
+        return self.schema.names
+
+    def to_pandas(self) -> pd.DataFrame:
+        """Materialize the full result (reads the spill file if there is one)."""
+        if self.table is not None:
+            return self.table.to_pandas()
+        return pd.read_parquet(self.spill_path)
+
+    def discard(self) -> None:
+        """Delete the spill file, if any."""
+        if self.spill_path is not None:
+            self.spill_path.unlink(missing_ok=True)
+            self.spill_path = None
+
+    @classmethod
+    def from_table(cls, table: pa.Table) -> "QueryResult":
+        return cls(table.schema, table.num_rows, table.nbytes, table.slice(0, PREVIEW_ROWS), table=table)
+
+
+def fetch_bounded(
+    reader: pa.RecordBatchReader,
+    max_rows: int,
+    max_bytes: int,
+    spill_dir: Path,
+) -> QueryResult:
+    """Drain *reader* batch by batch, spilling to Parquet once over budget.
+
+    At most one budget's worth of batches is ever held in memory, whatever
+    the size of the result.
+    """
+    batches: list[pa.RecordBatch] = []
+    preview: list[pa.RecordBatch] = []
+    rows = nbytes = preview_rows = 0
+    writer: pq.ParquetWriter | None = None
+    spill_path: Path | None = None
+
+    try:
+        for batch in reader:
+            rows += batch.num_rows
+            nbytes += batch.nbytes
+            if preview_rows < PREVIEW_ROWS:
+                preview.append(batch.slice(0, PREVIEW_ROWS - preview_rows))
+                preview_rows += preview[-1].num_rows
+
+            if writer is None and (rows > max_rows or nbytes > max_bytes):
+                spill_dir.mkdir(parents=True, exist_ok=True)
+                with tempfile.NamedTemporaryFile(dir=spill_dir, suffix=".parquet", delete=False) as f:
+                    spill_path = Path(f.name)
+                writer = pq.ParquetWriter(spill_path, reader.schema)
+                for pending in batches:
+                    writer.write_batch(pending)
+                batches = []
+
+            if writer is not None:
+                writer.write_batch(batch)
+            else:
+                batches.append(batch)
+    except BaseException:
+        if spill_path is not None:
+            if writer is not None:
+                writer.close()
+            spill_path.unlink(missing_ok=True)
+        raise
+
+    preview_table = pa.Table.from_batches(preview, schema=reader.schema)
+    if writer is not None:
+        writer.close()
+        log.info("Result spilled to %s (%d rows, %d bytes)", spill_path, rows, nbytes)
+        return QueryResult(reader.schema, rows, nbytes, preview_table, spill_path=spill_path)
+
+    table = pa.Table.from_batches(batches, schema=reader.schema)
+    return QueryResult(reader.schema, rows, nbytes, preview_table, table=table)
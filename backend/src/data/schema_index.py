@@ -0,0 +1,141 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from config.config import settings
+from data.loader import format_dataset_info, get_generation, get_info
+from data.profile import get_dataset_profiles_str, get_profile_store
+
+# Words in identifiers: "customerID" -> customer, id; "PURCHASES_TRX" -> purchases, trx
+_WORDS = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+# Table names weigh more than their columns, and columns more than their values
+_NAME_WEIGHT = 3
+_COLUMN_WEIGHT = 2
+# Rendered dataset sections kept, per (generation, tables) selection
+_SECTION_CACHE_SIZE = 64
+
+
+def tokenize(text: str) -> list[str]:
+    return [_stem(word.lower()) for word in _WORDS.findall(text)]
+
+
+def _stem(word: str) -> str:
+    """Crude plural folding, so "purchases" matches "purchase"."""
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+class SchemaIndex:
+    """BM25 index over the dataset catalog, to find the tables relevant to a question.
+
+    Each table is one document made of its name, its column names and the
+    top values of its categorical columns (from already computed profiles).
+    The index is rebuilt lazily when the catalog changes or new profiles
+    become available. Everything is local: no embeddings, no network.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._docs: dict[str, Counter[str]] = {}
+        self._lengths: dict[str, int] = {}
+        self._idf: dict[str, float] = {}
+        self._avg_length = 0.0
+        self._key: tuple[int, int] | None = None
+        self._lock = threading.Lock()
+
+    def search(self, query: str, k: int) -> list[str]:
+        """Names of the (at most) *k* tables best matching *query*, best first."""
+        self._refresh()
+        terms = set(tokenize(query)) & self._idf.keys()
+        scores = {}
+        for name, tf in self._docs.items():
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[name] / self._avg_length)
+            score = sum(self._idf[t] * tf[t] * (self.k1 + 1) / (tf[t] + norm) for t in terms if t in tf)
+            if score > 0:
+                scores[name] = score
+        return sorted(scores, key=scores.__getitem__, reverse=True)[:k]
+
+    def _refresh(self) -> None:
+        store = get_profile_store()
+        info = get_info()
+        key = (get_generation(), sum(store.cached(ds["name"]) is not None for ds in info))
+        if key == self._key:
+            return
+        with self._lock:
+            if key == self._key:
+                return
+            docs = {ds["name"]: _document(ds, store.cached(ds["name"])) for ds in info}
+            df = Counter(term for tf in docs.values() for term in tf)
+            n = len(docs)
+            self._idf = {t: math.log(1 + (n - f + 0.5) / (f + 0.5)) for t, f in df.items()}
+            self._lengths = {name: sum(tf.values()) for name, tf in docs.items()}
+            self._avg_length = sum(self._lengths.values()) / n if n else 1.0
+            self._docs = docs
+            self._key = key
+
+
+def _document(ds: dict, profile: dict | None) -> Counter[str]:
+    tf = Counter(tokenize(ds["name"]) * _NAME_WEIGHT)
+    for column in ds["column_names"]:
+        tf.update(tokenize(column) * _COLUMN_WEIGHT)
+    for column in (profile or {}).get("columns", []):
+        for top in column["top_values"]:
+            tf.update(tokenize(top["value"]))
+    return tf
+
+
+def get_relevant_dataset_info_str(question: str) -> str:
+    """Dataset section of the system prompt for *question*.
+
+    Small catalogs are described in full. Past ``settings.schema_prompt_tables``
+    datasets, only the best matches are, and the model is pointed at the
+    ``list_tables``/``describe_table`` tools for the rest. Tables keep their
+    catalog order, and each rendering is memoized per dataset generation, so
+    the same tables always give a byte-identical section. Blocking (profiles
+    may be computed): call it from a worker thread.
+    """
+    info = get_info()
+    limit = settings.schema_prompt_tables
+    names = [ds["name"] for ds in info]
+    if 0 < limit < len(names):
+        selected = set(_index.search(question, limit) or names[:limit])
+        names = [name for name in names if name in selected]
+
+    key = (get_generation(), tuple(names))
+    with _sections_lock:
+        if (section := _sections.get(key)) is not None:
+            _sections.move_to_end(key)
+            return section
+
+    if settings.profile_in_prompt:
+        section = get_dataset_profiles_str(names)
+        # Datasets that failed to profile fell back to a plain line: retry them next time
+        complete = all(get_profile_store().cached(name) is not None for name in names)
+    else:
+        by_name = {ds["name"]: ds for ds in info}
+        section = "\n".join(format_dataset_info(by_name[name]) for name in names)
+        complete = True
+    if len(names) < len(info):
+        section += (
+            f"\n\n{len(info) - len(names)} more datasets are not listed here. "
+            "Call `list_tables` to search them and `describe_table` to see their columns."
+        )
+
+    if complete:
+        with _sections_lock:
+            _sections[key] = section
+            while len(_sections) > _SECTION_CACHE_SIZE:
+                _sections.popitem(last=False)
+    return section
+
+
+_index = SchemaIndex()
+_sections: OrderedDict[tuple, str] = OrderedDict()
+_sections_lock = threading.Lock()
+
+
+def get_schema_index() -> SchemaIndex:
+    return _index
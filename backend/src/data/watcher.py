@@ -0,0 +1,26 @@
+import asyncio
+import logging
+
+from config.config import settings
+from data.loader import reload_datasets
+from data.profile import get_profile_store
+
+log = logging.getLogger(__name__)
+
+
+async def watch_data_dir(interval: float) -> None:
+    """Poll the data directory every *interval* seconds and hot-reload changes.
+
+    Runs until cancelled. Loading happens in a worker thread so large CSVs
+    never block the event loop (and the SSE streams it serves). Changed
+    datasets are re-profiled straight away when profiles go in the prompt.
+    """
+    log.info("Watching data directory every %.1fs", interval)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            changed, _ = await asyncio.to_thread(reload_datasets)
+            if changed and settings.profile_in_prompt:
+                await asyncio.to_thread(get_profile_store().warm)
+        except Exception as exc:
+            log.error("Data reload failed: %s", exc, exc_info=True)
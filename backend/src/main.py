@@ -1,11 +1,24 @@
+import asyncio
 import logging
 import sys
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST
 
 from config.config import settings
+from agent.agent import get_agent
+from agent.llm import check_backends_periodically, get_http_client
 from api.v1 import router as v1_router
+from data.engine import get_engine
+from data.profile import get_profile_store
+from data.watcher import watch_data_dir
+from services.artifact_store import evict_periodically, get_artifact_store
+from services.metrics import export as export_metrics
+from services.render_pool import get_render_pool
+from services.sessions import get_session_store
 
 # Override uvicorn's root logger so our level/format takes effect
 logging.basicConfig(
@@ -21,10 +34,38 @@ for noisy in ['httpcore', 'httpx']:
     logging.getLogger(noisy).setLevel(logging.WARNING)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run background tasks (data hot-reload, profiling, LLM health checks, artifact eviction, render workers) for the lifetime of the app."""
+    # Singletons are built on first use; build them now, in this (worker) process, before serving
+    get_engine()
+    get_agent()
+    get_session_store()
+    get_artifact_store()
+
+    tasks = []
+    if settings.profile_in_prompt:
+        tasks.append(asyncio.create_task(asyncio.to_thread(get_profile_store().warm)))
+    if settings.data_watch_interval > 0:
+        tasks.append(asyncio.create_task(watch_data_dir(settings.data_watch_interval)))
+    if settings.llm_health_interval > 0:
+        tasks.append(asyncio.create_task(check_backends_periodically(settings.llm_health_interval)))
+    if settings.artifact_evict_interval > 0:
+        tasks.append(asyncio.create_task(evict_periodically(get_artifact_store(), settings.artifact_evict_interval)))
+    if settings.visualize_mode == "process":
+        get_render_pool().start()
+    yield
+    for task in tasks:
+        task.cancel()
+    get_render_pool().shutdown()
+    await get_http_client().aclose()
+
+
 app = FastAPI(
     title="Data Analysis API",
     description="Chat with an LLM agent that queries CSV datasets and builds visualizations.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -33,6 +74,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Run-ID", "Retry-After"],
 )
 
 app.include_router(v1_router, prefix="/api")
@@ -40,4 +82,10 @@ app.include_router(v1_router, prefix="/api")
 
 @app.get("/")
 async def hello_world():
-    return {"message": "Hello, world!"}
\ No newline at end of file
+    return {"message": "Hello, world!"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Prometheus scrape endpoint."""
+    return Response(export_metrics(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,207 @@
+"""Admission control for chat runs.
+
+Every run holds an LLM connection, plus DuckDB and Plotly work, for as
+long as it streams. A burst of runs overloads the (often local) model and
+slows everyone down, so at most ``CHAT_MAX_ACTIVE`` runs go at once in
+this process, and at most ``CHAT_MAX_ACTIVE_PER_CLIENT`` per client. Runs
+over the limits wait in a bounded queue served round-robin across
+clients, so one busy client cannot starve the others. When the queue
+(or a client's share of it) is full, new runs are shed with `QueueFull`.
+
+Usage:
+
+    ticket = get_admission().reserve(client)     # QueueFull -> 429
+    await get_admission().wait(ticket, report)   # report(position) while queued
+    try:
+        ...                                      # the run
+    finally:
+        get_admission().release(ticket)
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import Counter, deque
+from collections.abc import Callable
+
+from config.config import settings
+from services.metrics import CHAT_QUEUE_WAIT, CHAT_QUEUED, CHAT_REQUESTS
+
+log = logging.getLogger(__name__)
+
+# Run duration assumed for Retry-After estimates until runs have been timed
+_DEFAULT_RUN_SECONDS = 15.0
+# Weight of the latest run in the moving average of run durations
+_DURATION_SMOOTHING = 0.2
+
+
+class QueueFull(Exception):
+    """No room left in the queue; retry after `retry_after` seconds."""
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A run's place in the scheduler: queued, then holding a slot until released."""
+
+    def __init__(self, client: str) -> None:
+        self.client = client
+        self.state = "queued"  # -> "active" -> "released"
+        self.position = 0  # 1-based while queued
+        self.queued_at = time.monotonic()
+        self.started_at = 0.0
+        self.admitted = asyncio.Event()
+        self.on_position: Callable[[int], None] | None = None
+
+
+class AdmissionController:
+    """Global and per-client concurrency limits with a fair, bounded wait queue.
+
+    Limits of 0 mean unlimited (active runs) or no queue at all (queued
+    runs). Everything runs on the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self, max_active: int, max_active_per_client: int, max_queued: int, max_queued_per_client: int,
+    ) -> None:
+        self.max_active = max_active
+        self.max_active_per_client = max_active_per_client
+        self.max_queued = max_queued
+        self.max_queued_per_client = max_queued_per_client
+        self.active = 0
+        self.queued = 0
+        self._active_by_client: Counter[str] = Counter()
+        # One FIFO per client; dict order is the round-robin order (served clients move to the end)
+        self._waiting: dict[str, deque[Ticket]] = {}
+        self._run_seconds = _DEFAULT_RUN_SECONDS
+
+    def reserve(self, client: str) -> Ticket:
+        """A ticket for a new run of *client*, active at once if the limits allow.
+
+        Raises `QueueFull` when the run would have to wait and there is no
+        room left for it in the queue.
+        """
+        ticket = Ticket(client)
+        # Waiting runs of other clients are blocked by their own limit, or this slot would be theirs
+        if client not in self._waiting and self._has_slot(client):
+            self._start(ticket)
+            return ticket
+
+        waiting = self._waiting.get(client, ())
+        if self.queued >= self.max_queued or len(waiting) >= self.max_queued_per_client > 0:
+            CHAT_REQUESTS.labels("rejected").inc()
+            raise QueueFull(
+                f"Server busy: {self.active} runs active, {self.queued} waiting. Retry later.",
+                self._retry_after(),
+            )
+        self._waiting.setdefault(client, deque()).append(ticket)
+        self.queued += 1
+        CHAT_QUEUED.inc()
+        self._update_positions()
+        log.info("Admission – %s queued at position %d", client, ticket.position)
+        return ticket
+
+    async def wait(self, ticket: Ticket, on_position: Callable[[int], None]) -> None:
+        """Wait until *ticket* is active, calling ``on_position(position)`` whenever it moves.
+
+        Reports position 0 once admitted after waiting. Cancelling the wait
+        gives up the ticket.
+        """
+        if ticket.state == "active":
+            return
+        ticket.on_position = on_position
+        on_position(ticket.position)
+        try:
+            await ticket.admitted.wait()
+        except asyncio.CancelledError:
+            self.release(ticket)
+            raise
+        on_position(0)
+
+    def release(self, ticket: Ticket) -> None:
+        """Give up *ticket*'s place in the queue or its slot; idempotent."""
+        dequeued = ticket.state == "queued"
+        if dequeued:
+            waiting = self._waiting[ticket.client]
+            waiting.remove(ticket)
+            if not waiting:
+                del self._waiting[ticket.client]
+            self.queued -= 1
+            CHAT_QUEUED.dec()
+        elif ticket.state == "active":
+            self.active -= 1
+            self._active_by_client[ticket.client] -= 1
+            if not self._active_by_client[ticket.client]:
+                del self._active_by_client[ticket.client]
+            duration = time.monotonic() - ticket.started_at
+            self._run_seconds += _DURATION_SMOOTHING * (duration - self._run_seconds)
+        ticket.state = "released"
+        self._dispatch(reorder=dequeued)
+
+    def _has_slot(self, client: str) -> bool:
+        return (self.max_active <= 0 or self.active < self.max_active) and (
+            self.max_active_per_client <= 0 or self._active_by_client[client] < self.max_active_per_client
+        )
+
+    def _start(self, ticket: Ticket) -> None:
+        ticket.state = "active"
+        ticket.started_at = time.monotonic()
+        self.active += 1
+        self._active_by_client[ticket.client] += 1
+        ticket.admitted.set()
+
+    def _dispatch(self, reorder: bool = False) -> None:
+        """Hand free slots to waiting runs, one client at a time in round-robin order.
+
+        Queue positions are updated if a run was admitted, or if *reorder*
+        (a waiting run left the queue).
+        """
+        moved = reorder
+        while self._waiting:
+            client = next((c for c in self._waiting if self._has_slot(c)), None)
+            if client is None:
+                break
+            waiting = self._waiting.pop(client)
+            ticket = waiting.popleft()
+            if waiting:
+                self._waiting[client] = waiting  # Back of the round
+            self.queued -= 1
+            CHAT_QUEUED.dec()
+            CHAT_QUEUE_WAIT.observe(time.monotonic() - ticket.queued_at)
+            self._start(ticket)
+            moved = True
+        if moved:
+            self._update_positions()
+
+    def _update_positions(self) -> None:
+        """Expected admission order: the round-robin interleaving of the client queues."""
+        queues = list(self._waiting.values())
+        position = 0
+        for depth in range(max(map(len, queues), default=0)):
+            for waiting in queues:
+                if depth < len(waiting):
+                    position += 1
+                    ticket = waiting[depth]
+                    if ticket.position != position:
+                        ticket.position = position
+                        if ticket.on_position is not None:
+                            ticket.on_position(position)
+
+    def _retry_after(self) -> int:
+        """Seconds until a queue place likely frees up, from the average run duration."""
+        return max(math.ceil(self._run_seconds * (self.queued + 1) / max(self.max_active, 1)), 1)
+
+
+_admission = AdmissionController(
+    settings.chat_max_active,
+    settings.chat_max_active_per_client,
+    settings.chat_max_queued,
+    settings.chat_max_queued_per_client,
+)
+
+
+def get_admission() -> AdmissionController:
+    return _admission
@@ -0,0 +1,122 @@
+"""Opt-in cache of whole chat answers, replayed without calling the LLM.
+
+Users keep asking the same analytical questions ("top 10 cars by price",
+"churn rate by contract"), each one a full agent loop: several LLM turns,
+SQL and chart rendering. With ``ANSWER_CACHE`` enabled, the SSE events of
+a successful answer to a first-turn question are recorded; the same
+question asked again on the same dataset generation replays them
+(``tool_call``/``tool_result`` and artifact references included) in
+milliseconds.
+
+Questions match on their normalized text (case, whitespace and final
+punctuation folded). Below ``ANSWER_CACHE_SIMILARITY`` = 1, a close
+rewording matches too: the cosine similarity of the two questions' word
+vectors (stemmed, as for the schema index) must reach the threshold, and
+their numbers must be the same, so "top 5" never replays "top 10".
+Only questions opening a conversation are cached: later turns depend on
+what was said before.
+"""
+
+import logging
+import math
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from functools import cache
+
+from pydantic_ai.messages import ModelMessage
+
+from config.config import settings
+from data.loader import get_generation
+from data.schema_index import tokenize
+from services.artifact_store import get_artifact_store
+from services.metrics import ANSWER_CACHE_LOOKUPS
+
+log = logging.getLogger(__name__)
+
+_TRAILING = re.compile(r"[\s?!.]+$")
+
+
+def normalize(prompt: str) -> str:
+    return _TRAILING.sub("", " ".join(prompt.lower().split()))
+
+
+@dataclass
+class CachedAnswer:
+    prompt: str
+    generation: int
+    events: list[tuple[str, dict]]  # SSE events, as sent (coalesced), without the final Done
+    messages: list[ModelMessage]  # The run's history, to seed the conversation's session
+    artifacts: list[str]  # Artifacts referenced by the events, which must still exist to replay
+    terms: Counter[str] = field(default_factory=Counter)
+
+
+class AnswerCache:
+    """LRU of recorded answers by normalized question; used from the event loop only."""
+
+    def __init__(self, max_entries: int, similarity: float) -> None:
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self._entries: OrderedDict[str, CachedAnswer] = OrderedDict()
+
+    def get(self, prompt: str) -> CachedAnswer | None:
+        """The answer recorded for *prompt* (or a close rewording) on the current datasets."""
+        key = normalize(prompt)
+        answer = self._entries.get(key)
+        if answer is None and self.similarity < 1:
+            answer = self._most_similar(Counter(tokenize(key)))
+        if answer is not None and not self._replayable(answer):
+            del self._entries[normalize(answer.prompt)]
+            answer = None
+
+        ANSWER_CACHE_LOOKUPS.labels("miss" if answer is None else "hit").inc()
+        if answer is not None:
+            self._entries.move_to_end(normalize(answer.prompt))
+        return answer
+
+    def put(
+        self, prompt: str, events: list[tuple[str, dict]], messages: list[ModelMessage], artifacts: list[str],
+    ) -> None:
+        """Record the answer to *prompt*, unless it failed or said nothing."""
+        types = {event for event, _ in events}
+        if "error" in types or "content" not in types:
+            return
+        key = normalize(prompt)
+        self._entries[key] = CachedAnswer(
+            prompt, get_generation(), list(events), messages, list(artifacts), Counter(tokenize(key)),
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        log.info("Answer cache – recorded %d events for: %s", len(events), prompt)
+
+    def _replayable(self, answer: CachedAnswer) -> bool:
+        store = get_artifact_store()
+        return answer.generation == get_generation() and all(store.exists(name) for name in answer.artifacts)
+
+    def _most_similar(self, terms: Counter[str]) -> CachedAnswer | None:
+        numbers = {t for t in terms if t.isdigit()}
+        best, best_score = None, self.similarity
+        generation = get_generation()
+        for answer in self._entries.values():
+            if answer.generation != generation or {t for t in answer.terms if t.isdigit()} != numbers:
+                continue
+            if (score := _cosine(terms, answer.terms)) >= best_score:
+                best, best_score = answer, score
+        return best
+
+
+def _cosine(a: Counter[str], b: Counter[str]) -> float:
+    dot = sum(count * b[term] for term, count in a.items())
+    norms = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norms if norms else 0.0
+
+
+@cache
+def _build_answer_cache() -> AnswerCache:
+    return AnswerCache(settings.answer_cache_entries, settings.answer_cache_similarity)
+
+
+def get_answer_cache() -> AnswerCache | None:
+    """The answer cache, or None unless ``settings.answer_cache`` is enabled."""
+    return _build_answer_cache() if settings.answer_cache else None
@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from typing import Protocol
+
+from config.config import settings
+from services.artifacts import ENCODINGS, Artifact, decode
+
+log = logging.getLogger(__name__)
+
+
+#  Backends
+
+
+class StorageBackend(Protocol):
+    """Flat key -> bytes blob storage."""
+
+    def put(self, key: str, data: bytes) -> None: ...
+
+    def get(self, key: str) -> bytes:
+        """Raise ``FileNotFoundError`` for a missing key."""
+        ...
+
+    def delete(self, key: str) -> None: ...
+
+    def stat(self, key: str) -> tuple[int, float] | None:
+        """``(size, modified_timestamp)`` of a blob, or None if it is missing."""
+        ...
+
+    def scan(self) -> Iterator[tuple[str, int, float]]:
+        """Yield ``(key, size, modified_timestamp)`` for every blob."""
+        ...
+
+
+class LocalBackend:
+    """Blobs as files in one directory, written atomically."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def put(self, key: str, data: bytes) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.root / key)
+
+    def get(self, key: str) -> bytes:
+        return (self.root / key).read_bytes()
+
+    def delete(self, key: str) -> None:
+        (self.root / key).unlink(missing_ok=True)
+
+    def stat(self, key: str) -> tuple[int, float] | None:
+        try:
+            stat = (self.root / key).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime
+
+    def scan(self) -> Iterator[tuple[str, int, float]]:
+        for path in self.root.iterdir():
+            if path.is_file():
+                stat = path.stat()
+                yield path.name, stat.st_size, stat.st_mtime
+
+
+class S3Backend:
+    """Blobs in an S3-compatible bucket (AWS, MinIO, or a local stand-in via *endpoint_url*).
+
+    Credentials come from the usual ``AWS_*`` environment variables.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str | None = None) -> None:
+        import boto3  # Optional dependency, only needed for this backend
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = boto3.client("s3", endpoint_url=endpoint_url or None)
+
+    def put(self, key: str, data: bytes) -> None:
+        self._client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=data)
+
+    def get(self, key: str) -> bytes:
+        try:
+            obj = self._client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self._client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key) from None
+        return obj["Body"].read()
+
+    def delete(self, key: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def stat(self, key: str) -> tuple[int, float] | None:
+        from botocore.exceptions import ClientError
+
+        try:
+            obj = self._client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return obj["ContentLength"], obj["LastModified"].timestamp()
+
+    def scan(self) -> Iterator[tuple[str, int, float]]:
+        paginator = self._client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get("Contents", []):
+                yield obj["Key"][len(self.prefix):], obj["Size"], obj["LastModified"].timestamp()
+
+
+#  Store
+
+
+@dataclass
+class _Entry:
+    size: int
+    created: float
+    last_access: float
+
+
+class ArtifactStore:
+    """Artifact index over a `StorageBackend`, with a byte quota and TTL.
+
+    The index (size, creation and last access per artifact) is rebuilt
+    from the backend at startup, with the blob mtime standing in for both
+    timestamps. `evict()` is meant to run periodically in the background:
+    it drops artifacts older than the TTL, then least recently used ones
+    until the total fits the quota.
+
+    Other processes (gunicorn workers) may share the backend, each with
+    its own index: `exists` checks the backend on a miss and adopts what
+    it finds, and `evict` first syncs the index with the backend, so the
+    quota applies to everything stored. Last access times stay per
+    process, so LRU order only approximates the global one.
+    """
+
+    def __init__(self, backend: StorageBackend, max_bytes: int, ttl: float) -> None:
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries: dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._rebuild_index()
+
+    def put(self, artifact: Artifact) -> None:
+        now = time.time()
+        with self._lock:
+            if artifact.name in self._entries:
+                self._entries[artifact.name].last_access = now
+                return
+        for encoding, blob in artifact.blobs.items():
+            self.backend.put(artifact.name + ENCODINGS[encoding], blob)
+        with self._lock:
+            self._entries[artifact.name] = _Entry(artifact.size, now, now)
+
+    def exists(self, name: str) -> bool:
+        with self._lock:
+            if name in self._entries:
+                return True
+        # Possibly stored by another process since the index was built
+        blobs = {encoding: self.backend.stat(name + suffix) for encoding, suffix in ENCODINGS.items()}
+        if blobs["gzip"] is None:  # Always written
+            return False
+        size = sum(blob[0] for blob in blobs.values() if blob is not None)
+        with self._lock:
+            self._entries.setdefault(name, _Entry(size, blobs["gzip"][1], time.time()))
+        return True
+
+    def read_encoded(self, name: str, encoding: str) -> bytes:
+        """The stored bytes of *name* in *encoding* (a key of ``ENCODINGS``)."""
+        with self._lock:
+            if name in self._entries:
+                self._entries[name].last_access = time.time()
+        return self.backend.get(name + ENCODINGS[encoding])
+
+    def read(self, name: str) -> bytes:
+        """The decompressed content of *name*."""
+        return decode(self.read_encoded(name, "gzip"))
+
+    def evict(self) -> int:
+        """Apply the TTL, then the quota (LRU). Return the number of artifacts removed."""
+        self._sync_index()
+        now = time.time()
+        with self._lock:
+            by_access = sorted(self._entries.items(), key=lambda item: item[1].last_access)
+            total = sum(entry.size for entry in self._entries.values())
+            doomed = []
+            for name, entry in by_access:
+                expired = self.ttl > 0 and now - entry.created > self.ttl
+                if expired or total > self.max_bytes:
+                    doomed.append(name)
+                    total -= entry.size
+            for name in doomed:
+                del self._entries[name]
+            self.evictions += len(doomed)
+
+        for name in doomed:
+            for suffix in ENCODINGS.values():
+                self.backend.delete(name + suffix)
+        if doomed:
+            log.info("Artifact store – evicted %d artifacts", len(doomed))
+        return len(doomed)
+
+    def usage(self) -> dict:
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            "artifacts": len(entries),
+            "bytes": sum(entry.size for entry in entries),
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "evictions": self.evictions,
+            "oldest_access": min((entry.last_access for entry in entries), default=None),
+        }
+
+    def _rebuild_index(self) -> None:
+        self._entries = self._scan()
+        log.info("Artifact store – indexed %d artifacts", len(self._entries))
+
+    def _sync_index(self) -> None:
+        """Adopt artifacts stored by other processes, forget those they evicted."""
+        started = time.time()
+        stored = self._scan()
+        with self._lock:
+            for name in self._entries.keys() - stored.keys():
+                if self._entries[name].created < started:  # Not put during the scan
+                    del self._entries[name]
+            for name, entry in stored.items():
+                self._entries.setdefault(name, entry)
+
+    def _scan(self) -> dict[str, _Entry]:
+        entries: dict[str, _Entry] = {}
+        suffixes = set(ENCODINGS.values()) | {".gz", ".br"}
+        for key, size, modified in self.backend.scan():
+            name, suffix = os.path.splitext(key)
+            if suffix not in suffixes:
+                continue  # Not an artifact (e.g. legacy HTML files)
+            entry = entries.setdefault(name, _Entry(0, modified, modified))
+            entry.size += size
+        return entries
+
+
+async def evict_periodically(store: "ArtifactStore", interval: float) -> None:
+    """Run `store.evict()` every *interval* seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(store.evict)
+        except Exception as exc:
+            log.error("Artifact eviction failed: %s", exc, exc_info=True)
+
+
+def _build_store() -> ArtifactStore:
+    if settings.artifact_backend == "s3":
+        backend = S3Backend(
+            settings.artifact_s3_bucket,
+            prefix=settings.artifact_s3_prefix,
+            endpoint_url=settings.artifact_s3_endpoint_url,
+        )
+    else:
+        backend = LocalBackend(Path(settings.artifact_dir))
+    return ArtifactStore(backend, settings.artifact_max_bytes, settings.artifact_ttl_seconds)
+
+
+@cache
+def get_artifact_store() -> ArtifactStore:
+    """The process' artifact store, built on first use (an S3 client must not cross a fork)."""
+    return _build_store()
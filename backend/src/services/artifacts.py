@@ -0,0 +1,44 @@
+"""Content-addressed encoding of agent output (Plotly JSON specs, tables).
+
+Artifacts are named after the hash of their content, so identical charts
+share one name and different charts can never overwrite each other.
+They are compressed once, when produced (gzip, plus brotli with the
+``brotli`` package from requirements.txt), and served as-is.
+
+Imports nothing from the app: render workers build artifacts here and
+hand them back to the parent, which stores them (see `artifact_store`).
+"""
+
+import gzip
+import hashlib
+from dataclasses import dataclass
+
+try:
+    import brotli
+except ImportError:  # Installed without requirements.txt: gzip only
+    brotli = None
+
+# Content-Encoding -> storage key suffix, in server preference order
+ENCODINGS = {"br": ".br", "gzip": ".gz"} if brotli is not None else {"gzip": ".gz"}
+
+
+@dataclass
+class Artifact:
+    name: str  # <hash><suffix>, e.g. "3fa1….json"
+    blobs: dict[str, bytes]  # Content-Encoding -> compressed bytes
+
+    @property
+    def size(self) -> int:
+        return sum(len(blob) for blob in self.blobs.values())
+
+
+def encode(data: bytes, suffix: str) -> Artifact:
+    """Name *data* by its content hash and compress it in every supported encoding."""
+    blobs = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        blobs = {"br": brotli.compress(data), **blobs}
+    return Artifact(hashlib.sha256(data).hexdigest()[:32] + suffix, blobs)
+
+
+def decode(gzip_blob: bytes) -> bytes:
+    return gzip.decompress(gzip_blob)
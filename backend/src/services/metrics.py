@@ -0,0 +1,188 @@
+"""Prometheus metrics for the chat pipeline, exported on ``/metrics``.
+
+Chat streams report through a `ChatTrace` (one per request); tools time
+themselves with `observe_tool`. Query-cache and artifact-store counters
+are read from their owners at scrape time rather than duplicated here.
+
+With several workers (``PROMETHEUS_MULTIPROC_DIR`` set, see
+``gunicorn.conf.py``), every worker writes its metrics to files in that
+directory and `export` aggregates all of them, whichever worker answers
+the scrape. Gauges say how their per-worker values combine. The
+query-cache and artifact-store metrics only exist in one worker's memory,
+so they are left out in that mode.
+"""
+
+import json
+import logging
+import os
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from config.config import settings
+from data.query_cache import get_query_cache
+from services.artifact_store import get_artifact_store
+
+log = logging.getLogger(__name__)
+
+# Latency buckets (seconds) sized for local LLMs: sub-second to minutes
+_LATENCY = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+_ROWS = (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+_BYTES = tuple(1024 * 4 ** i for i in range(12))  # 1 KiB .. 4 GiB
+_MULTIPROCESS = "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+CHAT_REQUESTS = Counter("chat_requests", "Chat streams by outcome.", ["outcome"])
+CHAT_ACTIVE = Gauge("chat_active_streams", "Chat streams currently running.", multiprocess_mode="livesum")
+CHAT_QUEUED = Gauge("chat_queued_runs", "Chat runs waiting for admission.", multiprocess_mode="livesum")
+CHAT_QUEUE_WAIT = Histogram("chat_queue_wait_seconds", "Time chat runs waited for admission.", buckets=_LATENCY)
+CHAT_DURATION = Histogram("chat_duration_seconds", "Full chat stream duration.", buckets=_LATENCY)
+CHAT_TTFT = Histogram("chat_ttft_seconds", "Time to the first content or thinking token.", buckets=_LATENCY)
+CHAT_FIRST_EVENT = Histogram(
+    "chat_first_event_seconds", "Time to the first SSE event of each type.", ["event"], buckets=_LATENCY,
+)
+LLM_ROUND_TRIPS = Histogram(
+    "chat_llm_requests", "LLM requests made per chat stream.", buckets=(1, 2, 3, 4, 5, 7, 10, 15, 20),
+)
+LLM_TOKENS = Counter(
+    "llm_tokens", "Tokens exchanged with the LLM (cache_read: input served from the provider's prompt cache).",
+    ["direction"],
+)
+LLM_BACKEND_INFLIGHT = Gauge(
+    "llm_backend_inflight", "LLM requests in flight per backend.", ["backend"], multiprocess_mode="livesum",
+)
+# Each worker checks the backends itself: down as soon as one worker finds it down
+LLM_BACKEND_UP = Gauge(
+    "llm_backend_up", "Whether the LLM backend passed its last health check.", ["backend"],
+    multiprocess_mode="livemin",
+)
+LLM_FAILOVERS = Counter("llm_backend_failovers", "LLM requests moved off a failing backend.", ["backend"])
+TITLES = Counter("summarize_titles", "Conversation titles by source (cache, llm, extractive).", ["source"])
+TITLE_BATCH_SIZE = Histogram("summarize_batch_size", "Titles generated per LLM call.", buckets=(1, 2, 4, 8, 16, 32))
+ANSWER_CACHE_LOOKUPS = Counter("answer_cache_lookups", "Answer cache lookups by result (hit, miss).", ["result"])
+TOOL_DURATION = Histogram(
+    "tool_duration_seconds", "Agent tool execution time.", ["tool", "outcome"], buckets=_LATENCY,
+)
+QUERY_ROWS = Histogram("query_result_rows", "Rows returned by query_data.", buckets=_ROWS)
+QUERY_BYTES = Histogram("query_result_bytes", "Arrow bytes returned by query_data.", buckets=_BYTES)
+
+
+@contextmanager
+def observe_tool(tool: str) -> Iterator[None]:
+    """Time a tool call; it counts as an error only if it raises."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        TOOL_DURATION.labels(tool, outcome).observe(time.perf_counter() - start)
+
+
+class ChatTrace:
+    """Stage timings of one chat stream.
+
+    Feeds the chat histograms when finished and, with ``CHAT_TRACE_LOG``
+    enabled, logs the whole trace as one JSON line.
+    """
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.first_event: dict[str, float] = {}
+        self.tools: list[dict] = []
+        self.llm_requests = 0
+        self.input_tokens = self.output_tokens = self.cache_read_tokens = 0
+        self._tool_starts: dict[str, tuple[str, float]] = {}
+        CHAT_ACTIVE.inc()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def event(self, event_type: str) -> None:
+        """Record an SSE event about to be sent."""
+        if event_type not in self.first_event:
+            self.first_event[event_type] = self.elapsed()
+
+    def tool_call(self, tool_call_id: str, tool_name: str) -> None:
+        self._tool_starts[tool_call_id] = (tool_name, self.elapsed())
+
+    def tool_result(self, tool_call_id: str) -> None:
+        if (started := self._tool_starts.pop(tool_call_id, None)) is not None:
+            name, at = started
+            self.tools.append({"tool": name, "start": round(at, 4), "seconds": round(self.elapsed() - at, 4)})
+
+    def usage(self, requests: int, input_tokens: int, output_tokens: int, cache_read_tokens: int = 0) -> None:
+        self.llm_requests = requests
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cache_read_tokens = cache_read_tokens
+
+    def finish(self, outcome: str) -> None:
+        """Close the trace with *outcome* ("ok", "error" or "cancelled")."""
+        duration = self.elapsed()
+        CHAT_ACTIVE.dec()
+        CHAT_REQUESTS.labels(outcome).inc()
+        CHAT_DURATION.observe(duration)
+        for event_type, at in self.first_event.items():
+            CHAT_FIRST_EVENT.labels(event_type).observe(at)
+        if (ttft := self.ttft) is not None:
+            CHAT_TTFT.observe(ttft)
+        if self.llm_requests:
+            LLM_ROUND_TRIPS.observe(self.llm_requests)
+            LLM_TOKENS.labels("input").inc(self.input_tokens)
+            LLM_TOKENS.labels("output").inc(self.output_tokens)
+            LLM_TOKENS.labels("cache_read").inc(self.cache_read_tokens)
+
+        if settings.chat_trace_log:
+            log.info("Chat trace %s", json.dumps({
+                "outcome": outcome,
+                "seconds": round(duration, 4),
+                "ttft": None if ttft is None else round(ttft, 4),
+                "first_event": {k: round(v, 4) for k, v in self.first_event.items()},
+                "llm_requests": self.llm_requests,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "cache_read_tokens": self.cache_read_tokens,
+                "tools": self.tools,
+            }))
+
+    @property
+    def ttft(self) -> float | None:
+        firsts = [self.first_event[e] for e in ("content", "thinking") if e in self.first_event]
+        return min(firsts, default=None)
+
+
+class _StoreCollector:
+    """Expose the query-cache and artifact-store counters at scrape time."""
+
+    def describe(self):
+        return []  # Otherwise registering collects, building the stores at import (before fork)
+
+    def collect(self):
+        if (cache := get_query_cache()) is not None:
+            stats = cache.stats()
+            yield GaugeMetricFamily("query_cache_entries", "Cached query results.", value=stats["entries"])
+            yield GaugeMetricFamily("query_cache_bytes", "Arrow bytes held by the query cache.", value=stats["bytes"])
+            for name in ("hits", "misses", "evictions"):
+                yield CounterMetricFamily(f"query_cache_{name}", f"Query cache {name}.", value=stats[name])
+
+        usage = get_artifact_store().usage()
+        yield GaugeMetricFamily("artifact_store_artifacts", "Stored artifacts.", value=usage["artifacts"])
+        yield GaugeMetricFamily("artifact_store_bytes", "Bytes stored (all encodings).", value=usage["bytes"])
+        yield GaugeMetricFamily("artifact_store_max_bytes", "Artifact storage quota.", value=usage["max_bytes"])
+        yield CounterMetricFamily("artifact_store_evictions", "Artifacts evicted.", value=usage["evictions"])
+
+
+def export() -> bytes:
+    """The scrape payload: this process' metrics, or every worker's in multiprocess mode."""
+    if not _MULTIPROCESS:
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
+
+
+if not _MULTIPROCESS:
+    REGISTRY.register(_StoreCollector())
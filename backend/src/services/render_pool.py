@@ -0,0 +1,190 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Literal
+
+import pyarrow as pa
+
+from config.config import settings
+from agent.tools.render import init_worker, render_shared, warm_up
+from data.result import QueryResult
+from services.artifacts import Artifact
+
+log = logging.getLogger(__name__)
+
+# Extra time the parent waits past the worker's own time limit before killing it
+_HARD_TIMEOUT_GRACE = 5.0
+
+
+class RenderPool:
+    """Process pool running `visualize` code away from the event loop.
+
+    Query results reach the workers without pickling: in-memory Arrow
+    tables are written once to a shared-memory segment as an IPC stream,
+    spilled results are passed by path.
+
+    This keeps plotting code off the event loop and bounds its time and
+    memory, and workers drop secrets from their environment (see
+    `init_worker`). It isolates crashes and timeouts, not a security
+    boundary: the code still runs with the server's user, filesystem and
+    network access. Each worker enforces the time limit itself (SIGALRM)
+    and a heap limit (RLIMIT_DATA). A worker still running its job past
+    the grace period is killed, found by the pid each job reports when it
+    starts. A dead worker breaks the whole executor, so it is replaced,
+    and the renders it took down with it run again on the new one.
+    """
+
+    def __init__(self, workers: int, timeout: float, memory_limit_mb: int, max_points: int) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_points = max_points
+        self._executor: ProcessPoolExecutor | None = None
+        self._started: multiprocessing.Queue | None = None  # (job, pid) reported by the workers
+        self._generation = 0  # Bumped whenever the executor is replaced
+        self._killed: set[int] = set()  # Generations whose executor we broke by killing a worker
+        self._jobs = itertools.count()
+        self._running: set[int] = set()
+        self._pids: dict[int, int] = {}  # Running job -> worker pid
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Forking a process that runs DuckDB threads is unsafe: start clean interpreters.
+            context = multiprocessing.get_context("spawn")
+            self._started = context.Queue()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=init_worker,
+                initargs=(self.memory_limit_mb, self._started),
+            )
+        return self._executor
+
+    def start(self) -> None:
+        """Spawn the workers ahead of the first request (imports take ~1s)."""
+        for _ in range(self.workers):
+            self.executor.submit(warm_up)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor, self._started = None, None
+
+    async def render(
+        self,
+        result: QueryResult,
+        code: str,
+        title: str,
+        result_type: Literal["figure", "table"],
+    ) -> tuple[str, list[Artifact]]:
+        """Render in a worker; return the tool result text and the artifacts to store.
+
+        A render taken down by another job's worker being killed is run
+        again; one whose own worker crashed twice is reported as a crash.
+        """
+        shm = None
+        if result.spill_path is not None:
+            source = str(result.spill_path)
+        else:
+            shm, size = _share_table(result.table)
+            source = f"shm:{shm.name}:{size}"
+
+        loop = asyncio.get_running_loop()
+        crashes = 0
+        try:
+            while True:
+                job, generation = next(self._jobs), self._generation
+                self._running.add(job)
+                try:
+                    future = loop.run_in_executor(
+                        self.executor, render_shared, job, source, code, title, result_type, self.timeout,
+                        self.max_points,
+                    )
+                    return await asyncio.wait_for(future, self.timeout + _HARD_TIMEOUT_GRACE)
+                except asyncio.TimeoutError:
+                    log.error("Render worker unresponsive after %.0fs – killing it", self.timeout)
+                    self._kill(job, generation)
+                    return f"Code execution error: visualization exceeded the {self.timeout:g}s time limit.", []
+                except BrokenProcessPool:
+                    self._replace(generation)
+                    if generation not in self._killed:
+                        crashes += 1
+                    if crashes >= 2:
+                        log.error("Render worker died – visualization failed")
+                        return "Code execution error: the visualization worker crashed (likely out of memory).", []
+                    log.warning("Render worker died – retrying on a new pool")
+                finally:
+                    self._running.discard(job)
+                    self._pids.pop(job, None)
+                    self._collect_pids()
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+    def _kill(self, job: int, generation: int) -> None:
+        """Kill the worker running *job*; the executor breaks and is replaced."""
+        if generation != self._generation:
+            return  # That executor is already gone, with its workers
+        self._collect_pids()
+        if (pid := self._pids.get(job)) is None:
+            return  # Never started: it timed out waiting behind other renders
+        self._killed.add(generation)
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self._replace(generation)
+
+    def _replace(self, generation: int) -> None:
+        """Drop the executor of *generation*, if still current; the next render starts a new one."""
+        if generation == self._generation and self._executor is not None:
+            # Queued renders are not cancelled: the broken executor fails them and they run again
+            self._executor.shutdown(wait=False)
+            self._executor, self._started = None, None
+            self._generation += 1
+
+    def _collect_pids(self) -> None:
+        """Record which worker runs each job, from the workers' start reports."""
+        while self._started is not None:
+            try:
+                job, pid = self._started.get_nowait()
+            except queue.Empty:
+                return
+            if job in self._running:  # Reports can arrive after their job's result
+                self._pids[job] = pid
+
+
+def _share_table(table: pa.Table) -> tuple[SharedMemory, int]:
+    """Copy *table* into a new shared-memory segment as an Arrow IPC stream."""
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    size = sink.size()
+
+    shm = SharedMemory(create=True, size=max(size, 1))
+    stream = pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf))
+    with pa.ipc.new_stream(stream, table.schema) as writer:
+        writer.write_table(table)
+    stream.close()
+    return shm, size
+
+
+_render_pool = RenderPool(
+    workers=settings.visualize_workers,
+    timeout=settings.visualize_timeout,
+    memory_limit_mb=settings.visualize_memory_limit_mb,
+    max_points=settings.visualize_max_points,
+)
+
+
+def get_render_pool() -> RenderPool:
+    return _render_pool
@@ -0,0 +1,182 @@
+"""Agent runs decoupled from the HTTP connection that started them.
+
+Each chat runs as a background task writing numbered SSE frames into a
+per-run log of at most ``RUN_LOG_BYTES``. Clients read the log from any
+position: the connection that started the run from the beginning, a
+reconnecting one from the event after its ``Last-Event-ID``, both then
+tailing live events. When the log is full, the oldest frames are dropped
+once every connected client has read them; until then the run waits, so
+a slow client pauses the agent instead of growing the log. A run nobody
+listens to for ``RUN_ORPHAN_TIMEOUT`` seconds is cancelled; finished
+runs stay resumable for ``RUN_RETENTION_SECONDS``. Runs wait for a slot
+from `services.admission` first, logging ``queued`` events with their
+position meanwhile.
+"""
+
+import asyncio
+import logging
+import uuid
+from collections import deque
+from collections.abc import AsyncGenerator, Callable
+from itertools import islice
+
+from config.config import settings
+from api.models import ChatRequest
+from api.models.streaming import sse
+from services.admission import Ticket, get_admission
+from services.streaming import stream_chat
+
+log = logging.getLogger(__name__)
+
+
+class EventsExpired(Exception):
+    """The requested events were already dropped from the run's bounded log."""
+
+
+class AgentRun:
+    def __init__(self, run_id: str, max_bytes: int) -> None:
+        self.id = run_id
+        self.finished = False
+        self.max_bytes = max_bytes
+        self._log: deque[tuple[int, str]] = deque()  # (event id, frame)
+        self._log_bytes = 0
+        self._next_id = 0
+        self._subscribers = 0
+        self._cursors: dict[object, int] = {}  # Next event id of each connected client
+        self._changed = asyncio.Event()  # Set when a frame is logged or the run ends
+        self._read = asyncio.Event()  # Set when a client reads on or disconnects
+        self._task: asyncio.Task | None = None
+        self._orphan_timer: asyncio.TimerHandle | None = None
+
+    def start(self, request: ChatRequest, ticket: Ticket, on_finished: Callable[[], None]) -> None:
+        self._task = asyncio.create_task(self._produce(request, ticket))
+        self._task.add_done_callback(lambda _: on_finished())
+
+    def cancel(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def check_available(self, last_event_id: int) -> None:
+        """Raise `EventsExpired` if events after *last_event_id* can no longer be replayed."""
+        if self._log and last_event_id + 1 < self._log[0][0]:
+            raise EventsExpired(f"Run {self.id}: events before {self._log[0][0]} expired")
+
+    async def subscribe(self, last_event_id: int = -1) -> AsyncGenerator[str, None]:
+        """Yield frames after *last_event_id*, then live ones until the run ends."""
+        self._subscribers += 1
+        if self._orphan_timer is not None:
+            self._orphan_timer.cancel()
+            self._orphan_timer = None
+        key = object()
+        self._cursors[key] = last_event_id + 1
+        try:
+            while True:
+                cursor = self._cursors[key]
+                if self._log:
+                    first = self._log[0][0]
+                    if cursor < first:  # Frames dropped while the run couldn't wait (reconnect, cancellation)
+                        yield sse("error", {"content": "Stream fell too far behind and was truncated."})
+                        return
+                    for event_id, frame in list(islice(self._log, cursor - first, None)):
+                        yield frame
+                        self._cursors[key] = event_id + 1
+                        self._notify_read()
+                if self._cursors[key] >= self._next_id:
+                    if self.finished:
+                        return
+                    await self._changed.wait()
+        finally:
+            del self._cursors[key]
+            self._notify_read()
+            self._subscribers -= 1
+            if self._subscribers == 0 and not self.finished:
+                self._orphan_timer = asyncio.get_running_loop().call_later(
+                    settings.run_orphan_timeout, self._cancel_if_orphaned,
+                )
+
+    async def _put(self, event: str, data: dict) -> None:
+        """Log an event, first waiting until the connected clients have read enough to make room."""
+        frame = sse(event, data, event_id=self._next_id)
+        while self._log and self._log_bytes + len(frame) > self.max_bytes:
+            if any(cursor <= self._log[0][0] for cursor in self._cursors.values()):
+                await self._read.wait()
+            else:
+                self._drop_oldest()
+        self._add(frame)
+
+    def _append(self, event: str, data: dict) -> None:
+        """Log an event at once, dropping the oldest frames past the budget even if unread."""
+        frame = sse(event, data, event_id=self._next_id)
+        while self._log and self._log_bytes + len(frame) > self.max_bytes:
+            self._drop_oldest()
+        self._add(frame)
+
+    def _add(self, frame: str) -> None:
+        self._log.append((self._next_id, frame))
+        self._log_bytes += len(frame)
+        self._next_id += 1
+        self._notify()
+
+    def _drop_oldest(self) -> None:
+        _, frame = self._log.popleft()
+        self._log_bytes -= len(frame)
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _notify_read(self) -> None:
+        self._read.set()
+        self._read = asyncio.Event()
+
+    def _cancel_if_orphaned(self) -> None:
+        self._orphan_timer = None
+        if self._subscribers == 0 and not self.finished:
+            log.info("Run %s – no client for %.0fs, cancelling", self.id, settings.run_orphan_timeout)
+            self.cancel()
+
+    async def _produce(self, request: ChatRequest, ticket: Ticket) -> None:
+        admission = get_admission()
+        try:
+            await admission.wait(ticket, lambda position: self._append("queued", {"position": position}))
+            async for event, data in stream_chat(request):
+                await self._put(event, data)
+        except asyncio.CancelledError:
+            self._append("error", {"content": "Run cancelled."})
+            raise
+        except Exception as exc:
+            log.error("Run %s failed: %s", self.id, exc, exc_info=True)
+            self._append("error", {"content": str(exc)})
+        finally:
+            admission.release(ticket)
+            self.finished = True
+            self._notify()
+
+
+class RunRegistry:
+    """The runs of this process, by ID."""
+
+    def __init__(self, max_bytes: int, retention: float) -> None:
+        self.max_bytes = max_bytes
+        self.retention = retention
+        self._runs: dict[str, AgentRun] = {}
+
+    def start(self, request: ChatRequest, ticket: Ticket) -> AgentRun:
+        """Start a run of *request* on an admission *ticket*, which the run releases when done."""
+        run = AgentRun(uuid.uuid4().hex, self.max_bytes)
+        self._runs[run.id] = run
+        run.start(request, ticket, on_finished=lambda: self._expire_later(run.id))
+        return run
+
+    def get(self, run_id: str) -> AgentRun | None:
+        return self._runs.get(run_id)
+
+    def _expire_later(self, run_id: str) -> None:
+        asyncio.get_running_loop().call_later(self.retention, self._runs.pop, run_id, None)
+
+
+_registry = RunRegistry(settings.run_log_bytes, settings.run_retention_seconds)
+
+
+def get_run_registry() -> RunRegistry:
+    return _registry
@@ -0,0 +1,192 @@
+"""Server-side conversation history, keyed by conversation ID.
+
+Sessions hold the native pydantic-ai message list of a conversation
+(tool calls and results included), so clients only send the new prompt
+and the model sees the queries it already ran. Once a session exceeds
+its token budget, `compact` rewrites the oldest turns as plain
+question/answer text (keeping the SQL they ran) and drops the oldest
+ones if that is not enough.
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import cache
+from pathlib import Path
+from typing import Protocol
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    UserPromptPart,
+)
+
+from config.config import settings
+
+log = logging.getLogger(__name__)
+
+# Rough token estimate for budgeting: ~4 bytes of serialized JSON per token
+_BYTES_PER_TOKEN = 4
+
+
+class SessionStore(Protocol):
+    def load(self, conversation_id: str) -> list[ModelMessage] | None: ...
+
+    def save(self, conversation_id: str, messages: list[ModelMessage]) -> None: ...
+
+    def delete(self, conversation_id: str) -> None: ...
+
+
+class MemorySessionStore:
+    """Sessions in process memory, least recently used dropped past *max_sessions*."""
+
+    def __init__(self, max_sessions: int) -> None:
+        self.max_sessions = max_sessions
+        self._sessions: OrderedDict[str, list[ModelMessage]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, conversation_id: str) -> list[ModelMessage] | None:
+        with self._lock:
+            if (messages := self._sessions.get(conversation_id)) is not None:
+                self._sessions.move_to_end(conversation_id)
+            return messages
+
+    def save(self, conversation_id: str, messages: list[ModelMessage]) -> None:
+        with self._lock:
+            self._sessions[conversation_id] = messages
+            self._sessions.move_to_end(conversation_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, conversation_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(conversation_id, None)
+
+
+class SQLiteSessionStore:
+    """Sessions persisted in a SQLite file, so they survive restarts."""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "  id TEXT PRIMARY KEY, messages BLOB NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def load(self, conversation_id: str) -> list[ModelMessage] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT messages FROM sessions WHERE id = ?", (conversation_id,)).fetchone()
+        return None if row is None else ModelMessagesTypeAdapter.validate_json(row[0])
+
+    def save(self, conversation_id: str, messages: list[ModelMessage]) -> None:
+        blob = ModelMessagesTypeAdapter.dump_json(messages)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, messages, updated) VALUES (?, ?, ?)",
+                (conversation_id, blob, time.time()),
+            )
+
+    def delete(self, conversation_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (conversation_id,))
+
+
+#  Compaction
+
+
+def estimate_tokens(messages: list[ModelMessage]) -> int:
+    return len(ModelMessagesTypeAdapter.dump_json(messages)) // _BYTES_PER_TOKEN
+
+
+def compact(messages: list[ModelMessage], max_tokens: int, keep_turns: int) -> list[ModelMessage]:
+    """Fit *messages* in *max_tokens*, never touching the last *keep_turns* turns.
+
+    A turn starts at a user prompt. Older turns are first reduced to their
+    prompt and final answer (plus the SQL they ran), then dropped oldest
+    first. The system prompt is always kept.
+    """
+    if estimate_tokens(messages) <= max_tokens:
+        return messages
+
+    system = [part for part in messages[0].parts if isinstance(part, SystemPromptPart)] if messages else []
+    turns = _split_turns(messages)
+    split = max(len(turns) - keep_turns, 0)
+    old, recent = turns[:split], turns[split:]
+    condensed = [_condense(turn) for turn in old]
+
+    def assemble() -> list[ModelMessage]:
+        flat = [m for turn in condensed + recent for m in turn]
+        if system and flat and isinstance(flat[0], ModelRequest):
+            flat[0] = ModelRequest(parts=[*system, *[p for p in flat[0].parts if not isinstance(p, SystemPromptPart)]])
+        return flat
+
+    compacted = assemble()
+    while condensed and estimate_tokens(compacted) > max_tokens:
+        condensed.pop(0)
+        compacted = assemble()
+
+    log.info(
+        "Session compacted – %d > %d messages, ~%d tokens",
+        len(messages), len(compacted), estimate_tokens(compacted),
+    )
+    return compacted
+
+
+def _split_turns(messages: list[ModelMessage]) -> list[list[ModelMessage]]:
+    turns: list[list[ModelMessage]] = []
+    for message in messages:
+        starts_turn = isinstance(message, ModelRequest) and any(isinstance(p, UserPromptPart) for p in message.parts)
+        if starts_turn or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _condense(turn: list[ModelMessage]) -> list[ModelMessage]:
+    """One turn as a plain prompt/answer pair, without tool calls and results."""
+    prompt = " ".join(
+        str(part.content)
+        for message in turn if isinstance(message, ModelRequest)
+        for part in message.parts if isinstance(part, UserPromptPart)
+    )
+    responses = [message for message in turn if isinstance(message, ModelResponse)]
+    answer = "".join(p.content for p in responses[-1].parts if isinstance(p, TextPart)) if responses else ""
+    answer = _strip_thinking(answer).strip()
+    queries = [
+        part.args_as_dict().get("sql", "")
+        for message in responses
+        for part in message.parts if isinstance(part, ToolCallPart) and part.tool_name == "query_data"
+    ]
+    if queries:
+        answer += "\n\n(Queries run: " + "; ".join(q for q in queries if q) + ")"
+    return [ModelRequest(parts=[UserPromptPart(content=prompt)]), ModelResponse(parts=[TextPart(content=answer)])]
+
+
+def _strip_thinking(text: str) -> str:
+    for open_tag, close_tag in settings.thinking_tags:
+        text = re.sub(re.escape(open_tag) + ".*?" + re.escape(close_tag), "", text, flags=re.DOTALL)
+    return text
+
+
+def _build_store() -> SessionStore:
+    if settings.session_backend == "sqlite":
+        return SQLiteSessionStore(Path(settings.session_sqlite_path))
+    return MemorySessionStore(settings.session_max_sessions)
+
+
+@cache
+def get_session_store() -> SessionStore:
+    """The process' session store, built on first use (after fork, for SQLite)."""
+    return _build_store()
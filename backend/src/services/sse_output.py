@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import suppress
+
+log = logging.getLogger(__name__)
+
+# Text events whose adjacent deltas can be merged into one event
+_TEXT_EVENTS = ("content", "thinking")
+_END = object()
+
+
+async def coalesce(
+    events: AsyncIterator[tuple[str, dict]],
+    window: float,
+    max_bytes: int,
+    queue_size: int,
+) -> AsyncGenerator[tuple[str, dict], None]:
+    """Pass *events* through, merging adjacent text deltas into one event.
+
+    Consecutive ``content`` (or ``thinking``) deltas are sent as one event
+    once *window* seconds have passed since the first of them, or once
+    they reach *max_bytes*; any other event flushes them first. The very
+    first text event is sent at once so time-to-first-token is unchanged.
+
+    *events* is consumed by a separate task through a queue of
+    *queue_size* events: when the consumer reads slower than the agent
+    produces (a run waits for its slowest client once its log is full),
+    the queue fills up and the agent is paused instead of events piling
+    up in memory (and the backlog is merged into larger events). Closing this generator cancels that task. A *window* of 0
+    disables merging.
+    """
+    if window <= 0:
+        async for item in events:
+            yield item
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    async def pump() -> None:
+        try:
+            async for item in events:
+                await queue.put(item)
+        except Exception as exc:  # The event source handles its own errors; don't hang the consumer
+            log.error("SSE event source failed: %s", exc, exc_info=True)
+        await queue.put(_END)
+
+    producer = asyncio.create_task(pump())
+    pending_event: str | None = None
+    pending: list[str] = []
+    pending_size = 0
+    deadline = 0.0
+    first_text = True
+
+    def flush() -> tuple[str, dict]:
+        nonlocal pending_event, pending, pending_size
+        merged = pending_event, {"content": "".join(pending)}
+        pending_event, pending, pending_size = None, [], 0
+        return merged
+
+    try:
+        while True:
+            if not queue.empty():  # Backlog from a slow client: merge it before waiting
+                item = queue.get_nowait()
+            elif pending_event is None:
+                item = await queue.get()
+            else:
+                try:
+                    item = await asyncio.wait_for(queue.get(), max(deadline - loop.time(), 0))
+                except TimeoutError:
+                    yield flush()
+                    continue
+
+            if item is _END:
+                break
+            event, data = item
+
+            if event in _TEXT_EVENTS:
+                if pending_event is not None and pending_event != event:
+                    yield flush()
+                if pending_event is None:
+                    pending_event = event
+                    deadline = loop.time() + (0 if first_text else window)
+                    first_text = False
+                pending.append(data["content"])
+                pending_size += len(data["content"])
+                if pending_size >= max_bytes or loop.time() >= deadline:
+                    yield flush()
+                continue
+
+            if pending_event is not None:
+                yield flush()
+            yield event, data
+
+        if pending_event is not None:
+            yield flush()
+    finally:
+        producer.cancel()
+        with suppress(asyncio.CancelledError):
+            await producer
@@ -1,6 +1,9 @@
+import asyncio
 import logging
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Callable, Sequence
 
+from pydantic_ai import AgentRunResultEvent
+from pydantic_ai.usage import RunUsage
 from pydantic_ai.messages import (
     TextPart,
     ThinkingPart,
@@ -11,28 +14,39 @@ from pydantic_ai.messages import (
     FunctionToolCallEvent,
     FunctionToolResultEvent,
     ToolReturnPart,
+    ModelMessage,
+    ModelRequest,
+    UserPromptPart,
 )
 
+from config.config import settings
 from api.models import ChatRequest, MessagePayload
-from api.models.streaming import sse, sse_text
 from agent.agent import get_agent
 from agent.context import AgentContext
-from data.loader import get_datasets, get_dataset_info_str
+from data.engine import get_engine
+from data.schema_index import get_relevant_dataset_info_str
+from data.query_cache import get_query_cache
+from services.answer_cache import get_answer_cache
 from services.history import build_history
+from services.metrics import CHAT_REQUESTS, ChatTrace
+from services.sessions import compact, get_session_store
+from services.sse_output import coalesce
 
 log = logging.getLogger(__name__)
 
-_OPEN_TAG = "<thinking>"
-_CLOSE_TAG = "</thinking>"
-
 
 class ThinkingTagParser:
-    """Strip ``<thinking>`` tags from streamed text and label each piece.
+    """Strip thinking tags from streamed text and label each piece.
 
     Models without native thinking support embed reasoning inside
-    ``<thinking>…</thinking>`` XML tags in the content stream.  This
-    parser splits those out so the frontend receives proper "thinking"
-    vs "content" events.
+    ``<thinking>…</thinking>`` (or ``<think>…</think>``) XML tags in the
+    content stream.  This parser splits those out so the frontend
+    receives proper "thinking" vs "content" events.  The tag pairs
+    default to ``settings.thinking_tags``.
+
+    It is an incremental scanner: each character is examined once and
+    only a possible partial tag at the end of a chunk (at most
+    ``len(tag) - 1`` chars) is carried over to the next one.
 
     Usage:
 
@@ -46,69 +60,66 @@ class ThinkingTagParser:
             emit(event_type, text)
     """
 
-    def __init__(self) -> None:
-        self._buf = ""
-        self._inside = False  # True while between <thinking> and </thinking>
+    def __init__(self, tags: Sequence[tuple[str, str]] | None = None) -> None:
+        if tags is None:
+            tags = settings.thinking_tags
+        self._open_tags = tuple(open_tag for open_tag, _ in tags)
+        self._close_for = {open_tag: close_tag for open_tag, close_tag in tags}
+        self._longest_open = max(map(len, self._open_tags))
+        self._pending = ""  # Possible partial tag held back from the last chunk
+        self._close: str | None = None  # Closing tag awaited while inside a thinking block
 
     def feed(self, chunk: str) -> list[tuple[str, str]]:
         """Accept new text and return any resolved (event_type, text) pairs."""
-        self._buf += chunk
-        return self._consume_tags()
+        text = self._pending + chunk if self._pending else chunk
+        self._pending = ""
+        lt = text.find("<")
+        if lt == -1:  # Fast path: most tokens contain no tag at all
+            return [(self._current_event, text)] if text else []
+
+        results: list[tuple[str, str]] = []
+        start = 0
+        while lt != -1:
+            candidates = self._open_tags if self._close is None else (self._close,)
+            tag = next((t for t in candidates if text.startswith(t, lt)), None)
+
+            if tag is not None:
+                # Everything before the tag belongs to the current state.
+                if lt > start:
+                    results.append((self._current_event, text[start:lt]))
+                self._close = self._close_for[tag] if self._close is None else None
+                start = lt + len(tag)
+                lt = text.find("<", start)
+                continue
+
+            # Hold back a trailing partial tag (e.g. "<thi" could be the start of "<thinking>").
+            longest = self._longest_open if self._close is None else len(self._close)
+            if len(text) - lt < longest and any(t.startswith(text[lt:]) for t in candidates):
+                self._pending = text[lt:]
+                break
+            lt = text.find("<", lt + 1)
+
+        end = len(text) - len(self._pending)
+        if end > start:
+            results.append((self._current_event, text[start:end]))
+        return results
 
     def flush(self) -> list[tuple[str, str]]:
         """Emit whatever is left in the buffer (end of stream)."""
-        if not self._buf:
+        if not self._pending:
             return []
-        leftover = [(self._current_event, self._buf)]
-        self._buf = ""
+        leftover = [(self._current_event, self._pending)]
+        self._pending = ""
         return leftover
 
     @property
     def _current_event(self) -> str:
         """The SSE event type for text at the current position."""
-        return "thinking" if self._inside else "content"
-
-    @property
-    def _next_tag(self) -> str:
-        """The tag we're waiting for next."""
-        return _CLOSE_TAG if self._inside else _OPEN_TAG
-
-    def _consume_tags(self) -> list[tuple[str, str]]:
-        """Extract all complete tag transitions from the buffer."""
-        results: list[tuple[str, str]] = []
+        return "content" if self._close is None else "thinking"
 
-        while (idx := self._buf.find(self._next_tag)) != -1:
-            # Everything before the tag belongs to the current state.
-            before = self._buf[:idx]
-            if before:
-                results.append((self._current_event, before))
-
-            # Skip past the tag and flip state.
-            self._buf = self._buf[idx + len(self._next_tag) :]
-            self._inside = not self._inside
-
-        # Emit remaining safe text, but hold back a trailing partial tag
-        # (e.g. "<thi" could be the start of "<thinking>").
-        if self._buf:
-            last_lt = self._buf.rfind("<")
-            is_partial_tag = (
-                last_lt != -1
-                and self._next_tag.startswith(self._buf[last_lt:])
-            )
-
-            if is_partial_tag:
-                safe = self._buf[:last_lt]
-                if safe:
-                    results.append((self._current_event, safe))
-                self._buf = self._buf[last_lt:]
-            else:
-                results.append((self._current_event, self._buf))
-                self._buf = ""
 
-        return results
-
-async def stream_chat(request: ChatRequest) -> AsyncGenerator[str, None]:
-    """Run the agent on *request* and yield SSE frames as they arrive.
+async def stream_chat(request: ChatRequest) -> AsyncGenerator[tuple[str, dict], None]:
+    """Run the agent on *request* and yield ``(event_type, payload)`` SSE events.
 
     Event types emitted:
       - ``content``      – assistant text chunk
@@ -116,60 +127,160 @@ async def stream_chat(request: ChatRequest) -> AsyncGenerator[str, None]:
       - ``tool_call``    – tool invocation (name, args, id)
       - ``tool_result``  – tool return value
       - ``error``        – if something blows up
-      - ``Done``         – final sentinel, always sent
+      - ``Done``         – final sentinel, sent unless the run was cancelled
+
+    Adjacent ``content``/``thinking`` chunks are merged into one event
+    within a short window (see `coalesce`). Runs are driven by
+    `services.runs`, which numbers and logs the events for the clients.
+    With the answer cache enabled, a question opening a conversation that
+    was already answered on the current datasets is replayed from it.
+    """
+    store = get_session_store()
+    history = None
+    if request.conversation_id is not None:
+        history = await asyncio.to_thread(store.load, request.conversation_id)
+    if history is None and request.resume:  # Lost since /chat checked it
+        yield "error", {"content": "Conversation history expired on the server, please resend your message."}
+        return
+    if history is None:  # Stateless client, or a session this server doesn't know yet
+        history = build_history(request.messages[:-1])
+    prompt = request.messages[-1].content
+    answers = get_answer_cache() if not history else None
+
+    if answers is not None and (answer := answers.get(prompt)) is not None:
+        log.info("Chat – replaying cached answer: %s", prompt)
+        CHAT_REQUESTS.labels("cached").inc()
+        if request.conversation_id is not None:
+            await asyncio.to_thread(store.save, request.conversation_id, answer.messages)
+        for event in answer.events:
+            yield event
+        yield "Done", {}
+        return
+
+    recorded: list[tuple[str, dict]] = []
+    result: list[tuple[list[ModelMessage], list[str]]] = []  # (messages, artifacts) once the run succeeds
+    async for event in coalesce(
+        _agent_events(request, history, on_result=None if answers is None else lambda *run: result.append(run)),
+        window=settings.sse_coalesce_ms / 1000,
+        max_bytes=settings.sse_coalesce_bytes,
+        queue_size=settings.sse_queue_size,
+    ):
+        if answers is not None:
+            recorded.append(event)
+        yield event
+
+    if answers is not None and result:
+        answers.put(prompt, recorded, *result[0])
+    yield "Done", {}
+
+
+async def _agent_events(
+    request: ChatRequest,
+    history: list[ModelMessage],
+    on_result: Callable[[list[ModelMessage], list[str]], None] | None = None,
+) -> AsyncGenerator[tuple[str, dict], None]:
+    """Run the agent on *request* and yield ``(event_type, payload)`` pairs.
+
+    ``on_result(messages, artifacts)`` is called with the compacted history
+    and the stored artifacts once the run completes.
     """
     agent = get_agent()
-    ctx = AgentContext(datasets=get_datasets(), dataset_info=get_dataset_info_str())
-
-    history = build_history(request.messages[:-1])
+    store = get_session_store()
     prompt = request.messages[-1].content
 
+    ctx = AgentContext(
+        engine=get_engine(),
+        dataset_info=await asyncio.to_thread(get_relevant_dataset_info_str, _schema_query(history, prompt)),
+        query_cache=get_query_cache(),
+    )
+
     log.info("Chat – prompt: %s | history: %d msgs", prompt, len(history))
 
     tag_parser = ThinkingTagParser()
+    trace = ChatTrace()
+    usage = RunUsage()  # Updated in place by the run, read back by the trace
+    outcome = "ok"
 
     try:
         async for ev in agent.run_stream_events(
             prompt,
             deps=ctx,
             message_history=history or None,
+            usage=usage,
         ):
             if isinstance(ev, PartStartEvent):
                 if isinstance(ev.part, TextPart) and ev.part.content:
                     for event_type, text in tag_parser.feed(ev.part.content):
-                        yield sse_text(event_type, text)
+                        trace.event(event_type)
+                        yield event_type, {"content": text}
                 elif isinstance(ev.part, ThinkingPart) and ev.part.content:
-                    yield sse_text("thinking", ev.part.content)
+                    trace.event("thinking")
+                    yield "thinking", {"content": ev.part.content}
 
             elif isinstance(ev, PartDeltaEvent):
                 if isinstance(ev.delta, TextPartDelta):
                     for event_type, text in tag_parser.feed(ev.delta.content_delta):
-                        yield sse_text(event_type, text)
+                        trace.event(event_type)
+                        yield event_type, {"content": text}
                 elif isinstance(ev.delta, ThinkingPartDelta):
-                    yield sse_text("thinking", ev.delta.content_delta)
+                    trace.event("thinking")
+                    yield "thinking", {"content": ev.delta.content_delta}
 
             elif isinstance(ev, FunctionToolCallEvent):
                 # Flush any buffered tag chars before a tool call.
                 for event_type, text in tag_parser.flush():
-                    yield sse_text(event_type, text)
-                yield sse("tool_call", {
+                    trace.event(event_type)
+                    yield event_type, {"content": text}
+                trace.event("tool_call")
+                trace.tool_call(ev.part.tool_call_id, ev.part.tool_name)
+                yield "tool_call", {
                     "tool_name": ev.part.tool_name,
                     "args": ev.part.args,
                     "tool_call_id": ev.part.tool_call_id,
-                })
+                }
 
             elif isinstance(ev, FunctionToolResultEvent) and isinstance(ev.result, ToolReturnPart):
-                yield sse("tool_result", {
+                trace.event("tool_result")
+                trace.tool_result(ev.tool_call_id)
+                yield "tool_result", {
                     "result": ev.result.content,
                     "tool_call_id": ev.tool_call_id,
-                })
+                }
+
+            elif isinstance(ev, AgentRunResultEvent) and (request.conversation_id is not None or on_result is not None):
+                messages = compact(ev.result.all_messages(), settings.session_max_tokens, settings.session_keep_turns)
+                if request.conversation_id is not None:
+                    await asyncio.to_thread(store.save, request.conversation_id, messages)
+                if on_result is not None:
+                    on_result(messages, ctx.artifacts)
 
         # Flush remaining buffer at end of stream.
         for event_type, text in tag_parser.flush():
-            yield sse_text(event_type, text)
-
+            trace.event(event_type)
+            yield event_type, {"content": text}
+
+    except asyncio.CancelledError:
+        # Cancelled (explicitly or abandoned by its clients): any running query is cancelled with us.
+        log.info("Chat – run cancelled")
+        outcome = "cancelled"
+        raise
     except Exception as exc:
         log.error("Streaming error: %s", exc, exc_info=True)
-        yield sse_text("error", str(exc))
+        outcome = "error"
+        trace.event("error")
+        yield "error", {"content": str(exc)}
     finally:
-        yield "event: Done\ndata: {}\n\n"
+        if ctx.current_result is not None:
+            ctx.current_result.discard()
+        trace.usage(usage.requests, usage.input_tokens, usage.output_tokens, usage.cache_read_tokens)
+        trace.finish(outcome)
+
+
+def _schema_query(history: list[ModelMessage], prompt: str, turns: int = 2) -> str:
+    """The new prompt plus the last *turns* user prompts, to pick the datasets to describe."""
+    earlier = [
+        str(part.content)
+        for message in history if isinstance(message, ModelRequest)
+        for part in message.parts if isinstance(part, UserPromptPart)
+    ]
+    return " ".join([*earlier[-turns:], prompt])
@@ -0,0 +1,172 @@
+"""Conversation titles for ``/summarize``, kept off the chat's inference path.
+
+The frontend asks for a title with every new conversation. Titles are:
+
+- cached by normalized message (LRU), so repeated openers cost nothing
+- micro-batched: requests arriving within ``SUMMARIZE_BATCH_MS`` share one
+  LLM call that titles them all
+- generated by ``SUMMARIZE_MODEL``, a smaller model than the agent's
+- extracted locally from the message (first content words) when too
+  many titles are waiting, when chat runs are queued for a slot, or when
+  the LLM call fails: a title is never worth slowing a chat down.
+"""
+
+import asyncio
+import logging
+import re
+from collections import OrderedDict
+from functools import cache
+
+from pydantic_ai import Agent
+
+from config.config import settings
+from agent.llm import get_model
+from services.admission import get_admission
+from services.metrics import TITLE_BATCH_SIZE, TITLES
+
+log = logging.getLogger(__name__)
+
+_SYSTEM_PROMPT = (
+    "You generate very short titles (maximum 5 words) that summarize a user message. "
+    "Reply ONLY with the title(s). No quotes, no punctuation at the end, no explanation."
+)
+# Characters of each message sent to the model (the opening says what a conversation is about)
+_MESSAGE_CHARS = 500
+_TITLE_WORDS = 5
+_NUMBERED = re.compile(r"^\s*(\d+)\s*[.):-]\s*(.+?)\s*$")
+_WORD = re.compile(r"[^\W_]+(?:-[^\W_]+)*")
+# Words skipped by extractive titles (English and French)
+_STOPWORDS = frozenset("""
+    a an the and or but of to in on at for from by with about into over under than then
+    is are was were be been being do does did have has had can could would should will shall may might
+    i me my we our you your he she it its they them their this that these those there here
+    what which who whom whose when where why how please show give tell find list make get let
+    le la les un une des du de d l et ou mais en au aux dans sur pour par avec sans sous
+    est sont était être avoir ai as a ont fait je j tu il elle on nous vous ils elles ce cet cette ces
+    mon ma mes ton ta tes son sa ses notre nos votre vos leur leurs qui que quoi dont où comment
+    quel quelle quels quelles combien montre montrez donne donnez peux pouvez stp svp
+    s t d l n c qu
+""".split())
+
+
+def normalize(message: str) -> str:
+    """Cache key of *message*: case and whitespace folded, cut to what the model sees."""
+    return " ".join(message.lower().split())[:_MESSAGE_CHARS]
+
+
+def extractive_title(message: str) -> str:
+    """A title made of the first content words of *message*, without any model."""
+    words = _WORD.findall(message)
+    content = [w for w in words if w.lower() not in _STOPWORDS] or words
+    title = " ".join(content[:_TITLE_WORDS])
+    return title[:1].upper() + title[1:] if title else "New conversation"
+
+
+class TitleService:
+    """Cached, micro-batched title generation; every method runs on the event loop."""
+
+    def __init__(
+        self, agent: Agent, cache_size: int, batch_window: float, max_batch: int, max_pending: int,
+    ) -> None:
+        self.agent = agent
+        self.cache_size = cache_size
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._waiting: dict[str, asyncio.Future[str]] = {}  # By key, until their batch is answered
+        self._batch: list[tuple[str, str]] = []  # (key, message) of the batch being gathered
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def title(self, message: str) -> str:
+        key = normalize(message)
+        if not key:
+            return "New conversation"
+        if (title := self._cache.get(key)) is not None:
+            self._cache.move_to_end(key)
+            TITLES.labels("cache").inc()
+            return title
+        if (future := self._waiting.get(key)) is not None:  # Same opener already on its way
+            return await asyncio.shield(future)
+        if len(self._waiting) >= self.max_pending or get_admission().queued:
+            TITLES.labels("extractive").inc()
+            return extractive_title(message)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[key] = future
+        self._batch.append((key, message))
+        if len(self._batch) >= self.max_batch:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        batch, self._batch = self._batch, []
+        if batch:
+            task = asyncio.create_task(self._answer(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _answer(self, batch: list[tuple[str, str]]) -> None:
+        TITLE_BATCH_SIZE.observe(len(batch))
+        try:
+            titles = await self._generate([message for _, message in batch])
+        except Exception as exc:
+            log.warning("Title generation failed for %d messages: %s", len(batch), exc)
+            titles = [None] * len(batch)
+
+        for (key, message), title in zip(batch, titles):
+            if title:
+                TITLES.labels("llm").inc()
+                self._remember(key, title)
+            else:
+                TITLES.labels("extractive").inc()
+                title = extractive_title(message)
+            if not (future := self._waiting.pop(key)).done():
+                future.set_result(title)
+
+    async def _generate(self, messages: list[str]) -> list[str | None]:
+        """One title per message (None where the model gave none), in one model call."""
+        if len(messages) == 1:
+            result = await self.agent.run(messages[0][:_MESSAGE_CHARS])
+            return [_clean(result.output)]
+
+        numbered = "\n".join(f"{i}. {' '.join(m.split())[:_MESSAGE_CHARS]}" for i, m in enumerate(messages, 1))
+        result = await self.agent.run(
+            f"Give a title to each of these {len(messages)} messages. Reply with exactly "
+            f"{len(messages)} lines, each `<number>. <title>`, in the same order.\n\n{numbered}"
+        )
+        titles: dict[int, str] = {}
+        for line in result.output.splitlines():
+            if match := _NUMBERED.match(line):
+                titles[int(match[1])] = _clean(match[2])
+        return [titles.get(i) or None for i in range(1, len(messages) + 1)]
+
+    def _remember(self, key: str, title: str) -> None:
+        self._cache[key] = title
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+def _clean(title: str) -> str:
+    title = title.strip().strip('"').strip("'").strip("*").strip()
+    return title.rstrip(".!?:;")
+
+
+@cache
+def get_title_service() -> TitleService:
+    """The process' title service, built on first use (its model shares the LLM client)."""
+    agent = Agent(model=get_model(settings.summarize_model), system_prompt=_SYSTEM_PROMPT)
+    return TitleService(
+        agent,
+        cache_size=settings.summarize_cache_size,
+        batch_window=settings.summarize_batch_ms / 1000,
+        max_batch=settings.summarize_max_batch,
+        max_pending=settings.summarize_max_pending,
+    )
@@ -10,7 +10,7 @@ import {
   useMemo,
   ReactNode,
 } from "react";
-import { summarizeMessage } from "@/lib/api";
+import { deleteSession, summarizeMessage } from "@/lib/api";
 import { Conversation, ChatMessage } from "@/lib/types";
 import {
   getAllConversations,
@@ -109,6 +109,7 @@ export function ConversationProvider({ children }: { children: ReactNode }) {
     (id: string) => {
       if (isLocked) return;
       deleteConversation(id);
+      deleteSession(id).catch(() => {}); // Best effort: the server may not know it
       const remaining = getAllConversations();
       if (remaining.length === 0) {
         const newId = generateId();
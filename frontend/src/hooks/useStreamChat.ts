@@ -1,8 +1,8 @@
 "use client";
 
 import { useState, useRef, useCallback, useEffect } from "react";
-import { streamMessage } from "@/lib/api";
-import { ChatMessage, ReasoningItem } from "@/lib/types";
+import { SessionMissingError, streamMessage } from "@/lib/api";
+import { ChatMessage, ReasoningItem, StreamCallbacks } from "@/lib/types";
 import {
   appendThinkingChunk,
   appendToolCall,
@@ -44,6 +44,8 @@ export function useStreamChat({
   const reasoningRef = useRef<ReasoningItem[]>([]);
   const plotFilesRef = useRef<string[]>([]);
   const abortRef = useRef<AbortController | null>(null);
+  // Conversations whose history the server already holds (this page session)
+  const syncedRef = useRef<Set<string>>(new Set());
 
   // Reset streaming state when switching conversations
   useEffect(() => {
@@ -79,54 +81,82 @@ export function useStreamChat({
 
       const controller = new AbortController();
       abortRef.current = controller;
+      let failed = false;
 
       try {
-        await streamMessage(
-          {
-            messages: updatedMessages.map((msg) => ({
-              role: msg.role,
-              content: msg.content,
-            })),
+        const callbacks: StreamCallbacks = {
+          onThinkingChunk: (chunk) => {
+            reasoningRef.current = appendThinkingChunk(
+              reasoningRef.current,
+              chunk,
+            );
+            setLiveReasoning([...reasoningRef.current]);
           },
-          {
-            onThinkingChunk: (chunk) => {
-              reasoningRef.current = appendThinkingChunk(
-                reasoningRef.current,
-                chunk,
-              );
-              setLiveReasoning([...reasoningRef.current]);
-            },
-            onToolCall: (tc) => {
-              reasoningRef.current = appendToolCall(
-                reasoningRef.current,
-                tc,
-              );
-              setLiveReasoning([...reasoningRef.current]);
-            },
-            onToolResult: (toolCallId, result) => {
-              reasoningRef.current = mergeToolResult(
-                reasoningRef.current,
-                toolCallId,
-                result,
-              );
-              setLiveReasoning([...reasoningRef.current]);
-              const plotFile = extractPlotFile(result);
-              if (plotFile) {
-                plotFilesRef.current = [...plotFilesRef.current, plotFile];
-              }
-            },
-            onContent: (chunk) => {
-              contentRef.current += chunk;
-              setStreamingContent((prev) => prev + chunk);
-            },
-            onDone: () => {},
-            onError: (error) => {
-              contentRef.current = `Error: ${error}`;
-              setStreamingContent(`Error: ${error}`);
-            },
+          onToolCall: (tc) => {
+            reasoningRef.current = appendToolCall(
+              reasoningRef.current,
+              tc,
+            );
+            setLiveReasoning([...reasoningRef.current]);
+          },
+          onToolResult: (toolCallId, result) => {
+            reasoningRef.current = mergeToolResult(
+              reasoningRef.current,
+              toolCallId,
+              result,
+            );
+            setLiveReasoning([...reasoningRef.current]);
+            const plotFile = extractPlotFile(result);
+            if (plotFile) {
+              plotFilesRef.current = [...plotFilesRef.current, plotFile];
+            }
           },
-          controller.signal,
-        );
+          onContent: (chunk) => {
+            contentRef.current += chunk;
+            setStreamingContent((prev) => prev + chunk);
+          },
+          onQueued: (position) => {
+            setStreamingContent(
+              position > 0
+                ? `Waiting for a free slot (position ${position})…`
+                : "",
+            );
+          },
+          onDone: () => {},
+          onError: (error) => {
+            failed = true;
+            contentRef.current = `Error: ${error}`;
+            setStreamingContent(`Error: ${error}`);
+          },
+        };
+
+        const send = (resume: boolean) =>
+          streamMessage(
+            {
+              messages: (resume ? [userMessage] : updatedMessages).map((msg) => ({
+                role: msg.role,
+                content: msg.content,
+              })),
+              conversation_id: activeConversationId,
+              resume,
+            },
+            callbacks,
+            controller.signal,
+          );
+
+        // Send the full history only until the server holds the session
+        try {
+          await send(syncedRef.current.has(activeConversationId));
+        } catch (err) {
+          if (!(err instanceof SessionMissingError)) throw err;
+          // Evicted, server restarted or another worker: seed the session again
+          syncedRef.current.delete(activeConversationId);
+          await send(false);
+        }
+
+        if (contentRef.current && !failed) {
+          syncedRef.current.add(activeConversationId);
+        }
 
         if (contentRef.current) {
           const assistantMsg: ChatMessage = {
@@ -163,7 +193,7 @@ export function useStreamChat({
         abortRef.current = null;
       }
     },
-    [input, isLoading, messages, setMessages, setIsLocked, autoRename],
+    [input, isLoading, messages, setMessages, setIsLocked, autoRename, activeConversationId],
   );
 
   return {
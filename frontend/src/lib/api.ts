@@ -24,12 +24,28 @@ const DEFAULT_TIMEOUT_MS = 30000;
 // ---------------------------------------------------------------------------
 
 class ApiError extends Error {
-  constructor(public status: number, message: string) {
+  constructor(
+    public status: number,
+    message: string,
+    /** Seconds to wait before retrying, from `Retry-After` (429/503). */
+    public retryAfter?: number,
+  ) {
     super(message);
     this.name = "ApiError";
   }
 }
 
+/**
+ * Thrown by `streamMessage` when a `resume` request names a session the
+ * server no longer holds: send the full history again.
+ */
+export class SessionMissingError extends Error {
+  constructor() {
+    super("Server-side session not found");
+    this.name = "SessionMissingError";
+  }
+}
+
 /**
  * Thin wrapper around `fetch` that:
  * - enforces a timeout via `AbortSignal.timeout`
@@ -52,7 +68,8 @@ async function apiFetch(
   const res = await fetch(`${API_BASE}${path}`, { ...init, signal });
 
   if (!res.ok) {
-    throw new ApiError(res.status, `HTTP ${res.status}: ${res.statusText}`);
+    const retryAfter = Number(res.headers.get("Retry-After")) || undefined;
+    throw new ApiError(res.status, `HTTP ${res.status}: ${res.statusText}`, retryAfter);
   }
   return res;
 }
@@ -71,6 +88,13 @@ export async function summarizeMessage(message: string): Promise<string> {
   return json.title as string;
 }
 
+/** Drop the server-side history of a conversation. */
+export async function deleteSession(conversationId: string): Promise<void> {
+  await apiFetch(`/api/v1/llm/sessions/${encodeURIComponent(conversationId)}`, {
+    method: "DELETE",
+  });
+}
+
 export async function fetchDatasets(): Promise<DatasetInfo[]> {
   const res = await apiFetch("/api/v1/data");
   const json = await res.json();
@@ -84,6 +108,7 @@ export async function fetchDatasets(): Promise<DatasetInfo[]> {
 interface SSEEvent {
   event: SSEEventType;
   data: string;
+  id?: number;
 }
 
 // -- Backend payload shapes (must match `sse` / `sse_text` in streaming.py) --
@@ -100,6 +125,11 @@ interface SSEToolCallPayload {
   tool_call_id: string;
 }
 
+/** Payload for `queued` events: place in the server's queue, 0 once the run starts. */
+interface SSEQueuedPayload {
+  position: number;
+}
+
 /** Payload for `tool_result` events (no `tool_name` — it's on the call). */
 interface SSEToolResultPayload {
   result: string;
@@ -113,13 +143,15 @@ interface SSEToolResultPayload {
 function parseSSEFrame(frame: string): SSEEvent | null {
   let event = "";
   let data = "";
+  let id: number | undefined;
 
   for (const line of frame.trim().split("\n")) {
     if (line.startsWith("event: ")) event = line.slice(7);
     else if (line.startsWith("data: ")) data = line.slice(6);
+    else if (line.startsWith("id: ")) id = Number(line.slice(4));
   }
 
-  return event ? { event: event as SSEEventType, data } : null;
+  return event ? { event: event as SSEEventType, data, id } : null;
 }
 
 /**
@@ -184,6 +216,12 @@ function dispatchSSEEvent(
         break;
       }
 
+      case SSE_EVENT.QUEUED: {
+        const { position } = JSON.parse(data) as SSEQueuedPayload;
+        callbacks.onQueued?.(position);
+        break;
+      }
+
       case SSE_EVENT.ERROR: {
         const { content } = JSON.parse(data) as SSETextPayload;
         callbacks.onError(content);
@@ -210,12 +248,23 @@ const CHUNK_TIMEOUT_MESSAGE =
 // Streaming chat
 // ---------------------------------------------------------------------------
 
+/** Reconnection attempts when a stream drops before `Done`. */
+const MAX_RESUME_ATTEMPTS = 3;
+const RESUME_BACKOFF_MS = 1_000;
+
 /**
  * Stream an LLM chat response over SSE, invoking `callbacks` as events
  * arrive. Supply an `AbortSignal` via `signal` to cancel the request.
  *
  * A per-chunk idle timeout (`CHUNK_TIMEOUT_MS`) fires if no data arrives
  * for too long — this is independent of the overall request duration.
+ *
+ * The agent run outlives the connection: if it drops mid-stream, the
+ * stream is resumed from the last received event id instead of running
+ * the agent again. Aborting cancels the run server-side.
+ *
+ * Throws `SessionMissingError` if `messages.resume` is set and the
+ * server no longer holds the session.
  */
 export async function streamMessage(
   messages: ChatMessagesRequest,
@@ -235,15 +284,69 @@ export async function streamMessage(
       0, // no overall timeout — idle timeout below handles stalls
     );
   } catch (err) {
+    if (err instanceof ApiError && err.status === 409 && messages.resume) {
+      throw new SessionMissingError();
+    }
+    if (err instanceof ApiError && err.status === 429) {
+      callbacks.onError(
+        `Server busy, try again in ${err.retryAfter ?? "a few"} seconds.`,
+      );
+      return;
+    }
     callbacks.onError(err instanceof Error ? err.message : String(err));
     return;
   }
 
-  const reader = res.body?.getReader();
-  if (!reader) {
-    callbacks.onError("No response body");
-    return;
+  const runId = res.headers.get("X-Run-ID");
+  const cursor = { lastEventId: -1 };
+  signal?.addEventListener("abort", () => {
+    if (runId) {
+      apiFetch(`/api/v1/llm/chat/${runId}`, { method: "DELETE" }).catch(() => {});
+    }
+  });
+
+  for (let attempt = 0; ; attempt++) {
+    try {
+      if (await readEventStream(res, callbacks, cursor)) return;
+      throw new Error("Stream ended before completion");
+    } catch (err) {
+      if ((err as DOMException)?.name === "AbortError") return;
+
+      const message = err instanceof Error ? err.message : String(err);
+      if (!runId || attempt >= MAX_RESUME_ATTEMPTS || message === CHUNK_TIMEOUT_MESSAGE) {
+        callbacks.onError(message);
+        return;
+      }
+    }
+
+    // Connection lost: replay what we missed, then follow the run live.
+    try {
+      await new Promise((r) => setTimeout(r, RESUME_BACKOFF_MS * (attempt + 1)));
+      res = await apiFetch(
+        `/api/v1/llm/chat/${runId}`,
+        { headers: { "Last-Event-ID": String(cursor.lastEventId) }, signal },
+        0,
+      );
+    } catch (err) {
+      if ((err as DOMException)?.name !== "AbortError") {
+        callbacks.onError(err instanceof Error ? err.message : String(err));
+      }
+      return;
+    }
   }
+}
+
+/**
+ * Read SSE frames from `res` until `Done`/`error` (returns `true`) or the
+ * body ends (returns `false`). Records each event id in `cursor`.
+ */
+async function readEventStream(
+  res: Response,
+  callbacks: StreamCallbacks,
+  cursor: { lastEventId: number },
+): Promise<boolean> {
+  const reader = res.body?.getReader();
+  if (!reader) throw new Error("No response body");
 
   const decoder = new TextDecoder();
   let buffer = "";
@@ -256,7 +359,7 @@ export async function streamMessage(
       );
 
       const { done, value } = await Promise.race([reader.read(), timeout]);
-      if (done) break;
+      if (done) return false;
 
       buffer += decoder.decode(value, { stream: true });
 
@@ -267,22 +370,15 @@ export async function streamMessage(
       for (const frame of frames) {
         const sseEvent = parseSSEFrame(frame);
         if (!sseEvent) continue;
+        if (sseEvent.id !== undefined) cursor.lastEventId = sseEvent.id;
 
         const result = dispatchSSEEvent(sseEvent, callbacks);
-        if (result === "done") return;
+        if (result === "done") return true;
 
         await yieldToEventLoop();
       }
     }
-  } catch (err) {
-    // Network failures, abort signals, etc.
-    if ((err as DOMException)?.name !== "AbortError") {
-      callbacks.onError(err instanceof Error ? err.message : String(err));
-    }
-    return;
   } finally {
     reader.releaseLock();
   }
-
-  callbacks.onDone();
 }
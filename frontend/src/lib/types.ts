@@ -4,6 +4,7 @@ export interface DatasetInfo {
   rows: number;
   columns: number;
   column_names: string[];
+  version: number;
 }
 
 // ---------------------------------------------------------------------------
@@ -15,6 +16,7 @@ export const SSE_EVENT = {
   CONTENT: "content",
   TOOL_CALL: "tool_call",
   TOOL_RESULT: "tool_result",
+  QUEUED: "queued",
   DONE: "Done",
   ERROR: "error",
 } as const;
@@ -53,6 +55,10 @@ export interface ToolCall {
 /* Message request */
 export interface ChatMessagesRequest {
   messages: ChatMessageRequest[];
+  /** Server-side session; once it exists only the new prompt needs sending */
+  conversation_id?: string;
+  /** Only the new prompt is sent: the server answers 409 if it lost the session */
+  resume?: boolean;
 }
 
 export interface ChatMessageRequest {
@@ -68,4 +74,6 @@ export interface StreamCallbacks {
   onContent: (chunk: string) => void;
   onDone: () => void;
   onError: (error: string) => void;
+  /** Position in the server's queue while waiting for a slot, 0 once started. */
+  onQueued?: (position: number) => void;
 }